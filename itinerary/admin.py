@@ -1,3 +1,97 @@
 from django.contrib import admin
 
-# Register your models here.
+from . import references
+from .models import ArchivedTrip, DailyDestinationStats, DestinationStats, NotificationLog, Trip, TripShare
+
+
+class ReadOnlyAdmin(admin.ModelAdmin):
+    """Rows maintained by the app itself (rollups, logs, archive); the admin only displays them."""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DestinationStats)
+class DestinationStatsAdmin(ReadOnlyAdmin):
+    list_display = ('name', 'trips', 'users', 'booked_trips', 'conversion', 'average_budget_display')
+    search_fields = ('destination', 'name')
+    ordering = ('-trips',)
+    show_full_result_count = False
+
+    @admin.display(description="Booking conversion")
+    def conversion(self, obj):
+        return f"{obj.conversion_rate:.1%}"
+
+    @admin.display(description="Average budget")
+    def average_budget_display(self, obj):
+        average = obj.average_budget
+        return f"₹{average:,.2f}" if average is not None else "-"
+
+
+@admin.register(DailyDestinationStats)
+class DailyDestinationStatsAdmin(ReadOnlyAdmin):
+    list_display = ('day', 'destination', 'trips', 'booked_trips')
+    list_select_related = ('destination',)
+    list_filter = ('day',)
+    date_hierarchy = 'day'
+    search_fields = ('destination__name',)
+    ordering = ('-day', '-trips')
+    show_full_result_count = False
+
+
+@admin.register(NotificationLog)
+class NotificationLogAdmin(ReadOnlyAdmin):
+    list_display = ('created_at', 'trip', 'channel', 'status', 'attempts', 'duration_ms')
+    list_select_related = ('trip', 'trip__user')
+    list_filter = ('channel', 'status')
+    search_fields = ('trip__booking_reference', 'trip__destination')
+    show_full_result_count = False
+
+
+class ReferenceSearchMixin:
+    def get_search_results(self, request, queryset, search_term):
+        # References are stored upper-case, so an exact match can use their
+        # unique index where the default case-insensitive search cannot.
+        code = search_term.strip().upper()
+        field = references.lookup_field(code)
+        if field:
+            return queryset.filter(**{field: code}), False
+        return super().get_search_results(request, queryset, search_term)
+
+
+@admin.register(Trip)
+class TripAdmin(ReferenceSearchMixin, admin.ModelAdmin):
+    list_display = ('booking_reference', 'ticket_id', 'destination', 'user', 'start_date', 'is_booked', 'created_at')
+    list_select_related = ('user',)
+    list_filter = ('is_booked',)
+    search_fields = ('=booking_reference', '=ticket_id', 'destination', '=user__email')
+    readonly_fields = ('booking_reference', 'ticket_id', 'created_at')
+    raw_id_fields = ('user',)
+    show_full_result_count = False
+
+
+@admin.register(ArchivedTrip)
+class ArchivedTripAdmin(ReferenceSearchMixin, ReadOnlyAdmin):
+    list_display = ('booking_reference', 'ticket_id', 'destination', 'user', 'end_date', 'is_booked', 'archived_at')
+    list_select_related = ('user',)
+    list_filter = ('is_booked',)
+    search_fields = ('=booking_reference', '=ticket_id', 'destination', '=user__email')
+    exclude = ('payload',)
+    show_full_result_count = False
+
+
+@admin.register(TripShare)
+class TripShareAdmin(ReadOnlyAdmin):
+    list_display = ('__str__', 'created_at', 'revoked_at', 'rendered_at')
+    raw_id_fields = ('trip', 'archived_trip')
+    exclude = ('html',)
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer('html')
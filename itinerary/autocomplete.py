@@ -0,0 +1,149 @@
+# itinerary/autocomplete.py
+"""
+Destination autocomplete over known places and popular trip destinations.
+
+Trip destinations are free text, so one only becomes a suggestion once
+DestinationStats shows at least AUTOCOMPLETE_MIN_TRIPS trips there from
+AUTOCOMPLETE_MIN_USERS different users; a place typed by a single user is
+never shown to anyone else.
+"""
+import bisect
+import heapq
+import os
+import re
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+
+from .providers import normalize_destination
+
+# Prefixes up to this length have their top results precomputed; longer
+# prefixes cover few enough keys to rank on the fly.
+PRECOMPUTED_PREFIX = 3
+
+_index = None
+_index_lock = threading.Lock()
+
+
+class PrefixIndex:
+    """Sorted normalized keys with canonical names and popularity, searched by bisect"""
+
+    def __init__(self, popularity, names, limit=10):
+        self.keys = sorted(popularity)
+        self.names = [names[key] for key in self.keys]
+        self.popularity = [popularity[key] for key in self.keys]
+        self.limit = limit
+        self.built_at = time.monotonic()
+
+        self._top = {}
+        for position, key in enumerate(self.keys):
+            for length in range(1, min(len(key), PRECOMPUTED_PREFIX) + 1):
+                best = self._top.setdefault(key[:length], [])
+                entry = (self.popularity[position], -position)
+                if len(best) < limit:
+                    heapq.heappush(best, entry)
+                elif entry > best[0]:
+                    heapq.heapreplace(best, entry)
+        for prefix, best in self._top.items():
+            self._top[prefix] = [-position for _, position in sorted(best, reverse=True)]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def canonical(self, destination):
+        """Canonical name for an exactly matching destination, or None"""
+        key = normalize_destination(destination)
+        i = bisect.bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return self.names[i]
+        return None
+
+    def search(self, query, limit=None):
+        """Up to `limit` (name, popularity) pairs whose key starts with the query"""
+        limit = min(limit or self.limit, self.limit)
+        prefix = normalize_destination(query)
+        if not prefix:
+            return []
+
+        if len(prefix) <= PRECOMPUTED_PREFIX:
+            positions = self._top.get(prefix, [])[:limit]
+        else:
+            start = bisect.bisect_left(self.keys, prefix)
+            end = bisect.bisect_left(self.keys, prefix + "\uffff", start)
+            positions = heapq.nsmallest(
+                limit, range(start, end), key=lambda i: (-self.popularity[i], i)
+            )
+        return [(self.names[i], self.popularity[i]) for i in positions]
+
+
+def _tidy(destination):
+    destination = re.sub(r"\s+", " ", destination.strip())
+    return re.sub(r"\s*,\s*", ", ", destination).strip(", ")
+
+
+def _known_places():
+    """(name, popularity) rows from KNOWN_PLACES_PATH: one place per line, optional tab and count"""
+    path = settings.KNOWN_PLACES_PATH
+    if not path or not os.path.exists(path):
+        return
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            name, _, count = line.rstrip("\n").partition("\t")
+            if name.strip():
+                yield name, int(count) if count.strip().isdigit() else 1
+
+
+def build_index():
+    from .models import DestinationStats
+
+    popularity = Counter()
+    spellings = {}
+
+    for name, count in _known_places():
+        key = normalize_destination(name)
+        popularity[key] += count
+        # Curated names always win over user spellings.
+        spellings[key] = Counter({_tidy(name): float('inf')})
+
+    rows = DestinationStats.objects.filter(
+        trips__gte=settings.AUTOCOMPLETE_MIN_TRIPS, users__gte=settings.AUTOCOMPLETE_MIN_USERS,
+    ).values_list('destination', 'name', 'trips')
+    for key, name, trips in rows.iterator():
+        if not key:
+            continue
+        popularity[key] += trips
+        spellings.setdefault(key, Counter())[_tidy(name)] += trips
+
+    names = {key: counts.most_common(1)[0][0] for key, counts in spellings.items()}
+    return PrefixIndex(popularity, names, limit=settings.AUTOCOMPLETE_LIMIT)
+
+
+def get_index():
+    """
+    This worker's index, built on first use and rebuilt after
+    AUTOCOMPLETE_REFRESH seconds. Only the first build makes callers wait;
+    once an index exists, one caller rebuilds it while the rest keep using
+    the old one.
+    """
+    global _index
+    index = _index
+    if index is None:
+        with _index_lock:
+            if _index is None:
+                _index = build_index()
+            return _index
+
+    if time.monotonic() - index.built_at > settings.AUTOCOMPLETE_REFRESH and _index_lock.acquire(blocking=False):
+        try:
+            if _index is index:
+                _index = build_index()
+        finally:
+            _index_lock.release()
+    return _index
+
+
+def canonical_destination(destination):
+    """Known canonical spelling of a destination, else the input with tidied spacing"""
+    return get_index().canonical(destination) or _tidy(destination)
@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth.models import User
 from .models import Trip
+from .autocomplete import canonical_destination
 
 class RegisterForm(forms.Form):
     email = forms.EmailField(
@@ -54,7 +55,9 @@ class TripForm(forms.ModelForm):
         widgets = {
             'destination': forms.TextInput(attrs={
                 'class': 'form-control',
-                'placeholder': 'e.g., Goa, India'
+                'placeholder': 'e.g., Goa, India',
+                'list': 'destination-suggestions',
+                'autocomplete': 'off'
             }),
             'start_date': forms.DateInput(attrs={
                 'class': 'form-control',
@@ -82,8 +85,26 @@ class TripForm(forms.ModelForm):
             }),
         }
     
+    def clean_destination(self):
+        destination = self.cleaned_data['destination']
+        return canonical_destination(destination)
+
     def clean_budget(self):
         budget = self.cleaned_data.get('budget')
         if budget and budget < 0:
             raise forms.ValidationError("Budget cannot be negative.")
-        return budget
\ No newline at end of file
+        return budget
+
+class TripImportForm(forms.Form):
+    csv_file = forms.FileField(
+        widget=forms.ClearableFileInput(attrs={
+            'class': 'form-control',
+            'accept': '.csv,text/csv'
+        })
+    )
+
+    def clean_csv_file(self):
+        csv_file = self.cleaned_data['csv_file']
+        if not csv_file.name.lower().endswith('.csv'):
+            raise forms.ValidationError("Please upload a .csv file.")
+        return csv_file
\ No newline at end of file
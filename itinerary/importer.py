@@ -0,0 +1,157 @@
+# itinerary/importer.py
+"""
+Bulk trip import from CSV: validate, insert in one batch, then enrich.
+
+Imported trips are saved with rule-based itineraries. AI itineraries are
+queued through refinement.submit() like any other new trip, but from the
+low-priority 'openrouter_background' bucket, so an upload never ties up the
+request with LLM calls or crowds out interactive planning. Rows past that
+budget are picked up later by `manage.py refine_trips`.
+"""
+import csv
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from . import planner, providers, ratelimit, refinement, rollups, search
+from .forms import TripForm
+from .models import Trip
+
+
+class ImportRow:
+    """Progress and outcome of one CSV row"""
+
+    def __init__(self, number, data):
+        self.number = number
+        self.data = data
+        self.trip = None
+        self.errors = []
+        self.steps = []
+
+    @property
+    def destination(self):
+        return self.trip.destination if self.trip else self.data.get('destination', '')
+
+    @property
+    def status(self):
+        if self.trip is None:
+            return "invalid"
+        return "created with warnings" if self.errors else "created"
+
+
+def parse_csv(uploaded_file, user):
+    """
+    Validate every row with TripForm. Returns (rows, trips) where trips are
+    unsaved Trip instances for the valid rows.
+    """
+    text = io.TextIOWrapper(uploaded_file.file, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(text)
+
+    rows = []
+    trips = []
+    for number, data in enumerate(reader, start=2):
+        row = ImportRow(number, {k.strip(): (v or '').strip() for k, v in data.items() if k})
+        rows.append(row)
+        if len(rows) > settings.TRIP_IMPORT_MAX_ROWS:
+            row.errors.append(f"Only {settings.TRIP_IMPORT_MAX_ROWS} rows can be imported at once.")
+            break
+
+        form = TripForm(row.data)
+        if not form.is_valid():
+            for field, errors in form.errors.items():
+                label = field if field != '__all__' else 'row'
+                row.errors.extend(f"{label}: {error}" for error in errors)
+            continue
+
+        trip = form.save(commit=False)
+        trip.user = user
+        if (trip.end_date - trip.start_date).days <= 0:
+            row.errors.append("End date must be after start date.")
+            continue
+
+        row.trip = trip
+        trips.append(trip)
+
+    return rows, trips
+
+
+def create_trips(rows, trips):
+    """Insert the valid rows with one bulk_create"""
+    Trip.objects.bulk_create(trips, batch_size=500)
+    # bulk_create skips save signals, so count the new trips in the rollups here.
+    rollups.record_created(trips)
+    if search.available():
+        search.index_trips(trips)
+    for row in rows:
+        if row.trip is not None:
+            row.steps.append("created")
+
+
+def _enrich(destination):
+    """Provider fields for `destination`, waiting out short rate limits"""
+    waited = 0
+    while True:
+        try:
+            return providers.enrich_destination(destination), None
+        except ratelimit.RateLimited as e:
+            if waited + e.retry_after > settings.TRIP_IMPORT_RETRY_WAIT:
+                return {}, str(e)
+            time.sleep(e.retry_after)
+            waited += e.retry_after
+        except Exception as e:
+            return {}, str(e)
+
+
+def enrich_trips(rows, generate_itinerary):
+    """
+    Fill provider data and rule-based itineraries for imported rows, then
+    queue AI itineraries. Each distinct destination is looked up once, with
+    at most TRIP_IMPORT_CONCURRENCY lookups in flight; trips are saved in
+    batches of TRIP_IMPORT_BATCH_SIZE.
+
+    Every queued AI itinerary takes a token from the global
+    'openrouter_background' bucket. Rows beyond that, or shed because the AI
+    queue is full, keep the rule-based plan until refine_trips queues them.
+    """
+    rows = [row for row in rows if row.trip is not None]
+    batch_size = settings.TRIP_IMPORT_BATCH_SIZE
+
+    destinations = {}
+    for row in rows:
+        destinations.setdefault(providers.normalize_destination(row.trip.destination), row.trip.destination)
+
+    with ThreadPoolExecutor(max_workers=settings.TRIP_IMPORT_CONCURRENCY) as pool:
+        enrichment = dict(zip(destinations, pool.map(_enrich, destinations.values())))
+
+    for row in rows:
+        fields, error = enrichment[providers.normalize_destination(row.trip.destination)]
+        for field, value in fields.items():
+            setattr(row.trip, field, value)
+        if error:
+            row.errors.append(f"Destination lookup failed: {error}")
+        else:
+            row.steps.append("enriched")
+
+        row.trip.itinerary = json.dumps(planner.build_for_trip(row.trip))
+        row.trip.itinerary_source = Trip.ITINERARY_RULES
+        row.steps.append("quick itinerary")
+
+    for start in range(0, len(rows), batch_size):
+        batch = [row.trip for row in rows[start:start + batch_size]]
+        Trip.objects.bulk_update(
+            batch, ['weather', 'attractions', 'hotels', 'distance_km', 'itinerary', 'itinerary_source'],
+        )
+        if search.available():
+            search.index_trips(batch)
+
+    deferred = False
+    for row in rows:
+        deferred = deferred or bool(ratelimit.take('openrouter_background'))
+        if not deferred and refinement.submit(row.trip, generate_itinerary):
+            row.steps.append("AI itinerary queued")
+        else:
+            deferred = True
+            row.steps.append("AI itinerary deferred")
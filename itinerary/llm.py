@@ -0,0 +1,242 @@
+# itinerary/llm.py
+"""Hedged OpenRouter chat completions across a configurable list of models."""
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+
+from . import ratelimit
+from .providers import http_session
+
+logger = logging.getLogger(__name__)
+
+OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+class LLMError(Exception):
+    """Raised when no configured model returned a usable completion."""
+
+
+class _Cancelled(Exception):
+    pass
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.OPENROUTER_MAX_WORKERS,
+                    thread_name_prefix="openrouter",
+                )
+    return _executor
+
+
+def _record(model, outcome, first_byte=None, total=None):
+    with _stats_lock:
+        entry = _stats.setdefault(model, {
+            'requests': 0,
+            'wins': 0,
+            'errors': 0,
+            'cancelled': 0,
+            'first_byte': deque(maxlen=500),
+            'total': deque(maxlen=500),
+        })
+        entry['requests'] += 1
+        if outcome == 'win':
+            entry['wins'] += 1
+        elif outcome == 'error':
+            entry['errors'] += 1
+        elif outcome == 'cancelled':
+            entry['cancelled'] += 1
+        if first_byte is not None:
+            entry['first_byte'].append(first_byte)
+        if total is not None:
+            entry['total'].append(total)
+
+    logger.info(
+        "openrouter model=%s outcome=%s first_byte=%s total=%s",
+        model, outcome,
+        f"{first_byte:.3f}" if first_byte is not None else "-",
+        f"{total:.3f}" if total is not None else "-",
+    )
+
+
+def _percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[index], 3)
+
+
+def model_latency_stats():
+    """Per-model request counts and latency percentiles (seconds) for this process"""
+    with _stats_lock:
+        snapshot = {model: dict(entry) for model, entry in _stats.items()}
+
+    result = {}
+    for model, entry in snapshot.items():
+        result[model] = {
+            'requests': entry['requests'],
+            'wins': entry['wins'],
+            'errors': entry['errors'],
+            'cancelled': entry['cancelled'],
+            'first_byte_p50': _percentile(entry['first_byte'], 50),
+            'first_byte_p95': _percentile(entry['first_byte'], 95),
+            'first_byte_p99': _percentile(entry['first_byte'], 99),
+            'total_p50': _percentile(entry['total'], 50),
+            'total_p95': _percentile(entry['total'], 95),
+            'total_p99': _percentile(entry['total'], 99),
+        }
+    return result
+
+
+def _request_model(model, prompt, api_key, timeout, started, cancel):
+    """Run one completion request, aborting the body read once `cancel` is set"""
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    payload = {
+        "model": model,
+        "messages": [
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        "temperature": 0.7
+    }
+
+    begin = time.monotonic()
+    first_byte = None
+    try:
+        if cancel.is_set():
+            raise _Cancelled()
+
+        # stream=True returns as soon as the response headers arrive, which is
+        # the "started responding" signal the hedging timer waits on.
+        response = http_session().post(
+            OPENROUTER_URL,
+            headers=headers,
+            json=payload,
+            timeout=timeout,
+            stream=True,
+        )
+        first_byte = time.monotonic() - begin
+
+        with response:
+            if response.status_code != 200:
+                raise LLMError(f"{model} returned HTTP {response.status_code}")
+
+            started.set()
+            body = bytearray()
+            for chunk in response.iter_content(chunk_size=8192):
+                if cancel.is_set():
+                    raise _Cancelled()
+                body.extend(chunk)
+
+        data = json.loads(body.decode(response.encoding or 'utf-8'))
+        content = data['choices'][0]['message']['content']
+        if not content:
+            raise LLMError(f"{model} returned an empty completion")
+        return content, first_byte
+
+    except _Cancelled:
+        _record(model, 'cancelled', first_byte)
+        raise
+    except Exception:
+        _record(model, 'error', first_byte, time.monotonic() - begin)
+        raise
+
+
+def complete(prompt, api_key, models=None):
+    """
+    Return (text, model) for the first valid completion among `models`.
+
+    The first model is asked immediately. If no model has started responding
+    within OPENROUTER_HEDGE_AFTER seconds, or every in-flight request failed,
+    the next model is asked as well. The first valid answer wins and the other
+    requests are cancelled. Every request takes a token from the global
+    "openrouter" rate limit; ratelimit.RateLimited is raised if the first one
+    cannot, and hedges are skipped while it is empty.
+    """
+    models = list(models or settings.OPENROUTER_MODELS)
+    if not models:
+        raise LLMError("No OpenRouter models configured")
+
+    hedge_after = settings.OPENROUTER_HEDGE_AFTER
+    timeout = settings.OPENROUTER_TIMEOUT
+    deadline = time.monotonic() + timeout
+
+    started = threading.Event()
+    cancel = threading.Event()
+    remaining_models = iter(models)
+    pending = {}
+    launched = {}
+    errors = []
+
+    def launch():
+        model = next(remaining_models, None)
+        if model is None:
+            return False
+        try:
+            ratelimit.limit('openrouter')
+        except ratelimit.RateLimited:
+            if not pending and not launched:
+                raise
+            return False
+        future = _get_executor().submit(
+            _request_model, model, prompt, api_key, timeout, started, cancel
+        )
+        pending[future] = model
+        launched[model] = time.monotonic()
+        return True
+
+    launch()
+    try:
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            wait_for = remaining if started.is_set() else min(hedge_after, remaining)
+            done, _ = wait(list(pending), timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            if not done:
+                if not started.is_set():
+                    launch()
+                continue
+
+            for future in done:
+                model = pending.pop(future)
+                try:
+                    text, first_byte = future.result()
+                except Exception as e:
+                    errors.append(f"{model}: {e}")
+                    continue
+                _record(model, 'win', first_byte, time.monotonic() - launched[model])
+                return text, model
+
+            if not pending:
+                launch()
+    finally:
+        cancel.set()
+        for future in pending:
+            future.cancel()
+
+    if not errors:
+        errors.append(f"no response within {timeout:.0f}s")
+    raise LLMError("; ".join(errors))
@@ -0,0 +1,73 @@
+# itinerary/management/commands/archive_trips.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from itinerary import rollups
+from itinerary.models import ArchivedTrip, Trip, TripShare
+
+
+class Command(BaseCommand):
+    help = (
+        "Move trips that ended more than TRIP_ARCHIVE_AFTER_DAYS ago into the "
+        "compressed ArchivedTrip table. Schedule it, e.g. cron: "
+        "30 3 * * * python manage.py archive_trips"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.TRIP_ARCHIVE_AFTER_DAYS,
+                            help="Archive trips whose end date is more than this many days ago")
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Trips moved per transaction")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only report how many trips would be archived")
+        parser.add_argument('--vacuum', action='store_true',
+                            help="Run VACUUM afterwards so SQLite returns the freed pages")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.localdate() - timedelta(days=options['days'])
+        due = Trip.objects.filter(end_date__lt=cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f"{due.count()} trip(s) ended before {cutoff} and would be archived.")
+            return
+
+        archived = 0
+        original_bytes = 0
+        stored_bytes = 0
+        while True:
+            with transaction.atomic():
+                batch = list(due.order_by('id').prefetch_related('notifications')[:options['batch_size']])
+                if not batch:
+                    break
+                rows = [ArchivedTrip.from_trip(trip) for trip in batch]
+                ArchivedTrip.objects.bulk_create(rows)
+                # Share links follow the trip into the archive instead of
+                # cascading away with it.
+                TripShare.objects.filter(trip_id__in=[trip.id for trip in batch]).update(
+                    archived_trip_id=F('trip_id'), trip=None,
+                )
+                # The trips move rather than disappear, so the rollups keep them.
+                with rollups.suspended():
+                    Trip.objects.filter(id__in=[trip.id for trip in batch]).delete()
+
+            archived += len(batch)
+            original_bytes += sum(
+                len((getattr(trip, field) or '').encode())
+                for trip in batch
+                for field in ('itinerary', 'weather', 'hotels', 'attractions')
+            )
+            stored_bytes += sum(len(row.payload) for row in rows)
+
+        if archived and options['vacuum'] and connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute("VACUUM")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {archived} trip(s) that ended before {cutoff}; "
+            f"{original_bytes / 1024:.0f} KB of trip text stored in {stored_bytes / 1024:.0f} KB."
+        ))
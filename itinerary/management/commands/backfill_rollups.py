@@ -0,0 +1,82 @@
+# itinerary/management/commands/backfill_rollups.py
+from itertools import chain
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from itinerary.models import ArchivedTrip, DailyDestinationStats, DestinationStats, DestinationUserStats, Trip
+from itinerary.providers import normalize_destination
+
+
+class Command(BaseCommand):
+    help = "Rebuild the destination analytics rollups from the Trip and ArchivedTrip tables."
+
+    def handle(self, *args, **options):
+        def grouped(model):
+            return (
+                model.objects
+                .annotate(day=TruncDate('created_at', tzinfo=timezone.get_current_timezone()))
+                .values('destination', 'day')
+                .annotate(
+                    trips=Count('id'),
+                    booked_trips=Count('id', filter=Q(is_booked=True)),
+                    budget_total=Sum('budget'),
+                    budget_trips=Count('budget'),
+                )
+                .order_by()
+            )
+
+        def grouped_by_user(model):
+            return model.objects.values('destination', 'user_id').annotate(trips=Count('id')).order_by()
+
+        totals = {}
+        daily = {}
+        per_user = {}
+        for row in chain(grouped(Trip).iterator(), grouped(ArchivedTrip).iterator()):
+            key = normalize_destination(row['destination'])
+            entry = totals.setdefault(key, DestinationStats(destination=key, name=row['destination']))
+            entry.trips += row['trips']
+            entry.booked_trips += row['booked_trips']
+            entry.budget_total += row['budget_total'] or 0
+            entry.budget_trips += row['budget_trips']
+
+            day_entry = daily.setdefault((key, row['day']), [0, 0])
+            day_entry[0] += row['trips']
+            day_entry[1] += row['booked_trips']
+
+        for row in chain(grouped_by_user(Trip).iterator(), grouped_by_user(ArchivedTrip).iterator()):
+            key = (normalize_destination(row['destination']), row['user_id'])
+            if key not in per_user:
+                totals[key[0]].users += 1
+            per_user[key] = per_user.get(key, 0) + row['trips']
+
+        with transaction.atomic():
+            DestinationUserStats.objects.all().delete()
+            DailyDestinationStats.objects.all().delete()
+            DestinationStats.objects.all().delete()
+            DestinationStats.objects.bulk_create(totals.values(), batch_size=1000)
+
+            ids = dict(DestinationStats.objects.values_list('destination', 'id'))
+            DailyDestinationStats.objects.bulk_create(
+                (
+                    DailyDestinationStats(
+                        destination_id=ids[key], day=day, trips=trips, booked_trips=booked
+                    )
+                    for (key, day), (trips, booked) in daily.items()
+                ),
+                batch_size=1000,
+            )
+            DestinationUserStats.objects.bulk_create(
+                (
+                    DestinationUserStats(destination_id=ids[key], user_id=user_id, trips=trips)
+                    for (key, user_id), trips in per_user.items()
+                ),
+                batch_size=1000,
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt rollups for {len(totals)} destinations over {len(daily)} destination-days."
+        ))
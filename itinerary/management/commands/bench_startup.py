@@ -0,0 +1,79 @@
+# itinerary/management/commands/bench_startup.py
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+BOOT = "from travelplanner.wsgi import application"
+
+
+def parse_importtime(stderr):
+    """(module, self_us, cumulative_us) rows from `python -X importtime` output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((module.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Boot the WSGI application in fresh interpreters, report the median "
+        "startup time against STARTUP_BUDGET_MS and the slowest imports. "
+        "Exits non-zero when the budget is exceeded."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--top', type=int, default=15,
+                            help="Number of slowest imports to list")
+        parser.add_argument('--budget-ms', type=float, default=None,
+                            help="Override STARTUP_BUDGET_MS")
+
+    def boot(self, importtime=False):
+        command = [sys.executable]
+        if importtime:
+            command += ["-X", "importtime"]
+        command += ["-c", BOOT]
+
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='travelplanner.settings')
+        started = time.perf_counter()
+        result = subprocess.run(
+            command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+        )
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if result.returncode != 0:
+            raise CommandError(f"Worker failed to boot:\n{result.stderr}")
+        return elapsed_ms, result.stderr
+
+    def handle(self, *args, **options):
+        budget_ms = options['budget_ms'] or settings.STARTUP_BUDGET_MS
+
+        # Interpreter start-up alone, so the report can show what the app adds.
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        baseline_ms = (time.perf_counter() - started) * 1000
+
+        timings = [self.boot()[0] for _ in range(max(options['runs'], 1))]
+        median_ms = statistics.median(timings)
+
+        _, stderr = self.boot(importtime=True)
+        rows = parse_importtime(stderr)
+        self.stdout.write(f"Slowest imports (cumulative ms) of {len(rows)} modules:")
+        for module, self_us, cumulative_us in sorted(rows, key=lambda r: -r[2])[:options['top']]:
+            self.stdout.write(f"  {cumulative_us / 1000:8.1f}  {self_us / 1000:7.1f} self  {module}")
+
+        self.stdout.write(
+            f"Interpreter {baseline_ms:.0f} ms; worker boot median {median_ms:.0f} ms "
+            f"(min {min(timings):.0f}, max {max(timings):.0f}) over {len(timings)} runs; "
+            f"budget {budget_ms:.0f} ms."
+        )
+        if median_ms > budget_ms:
+            raise CommandError(f"Startup budget exceeded by {median_ms - budget_ms:.0f} ms.")
+        self.stdout.write(self.style.SUCCESS("Startup within budget."))
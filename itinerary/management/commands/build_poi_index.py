@@ -0,0 +1,75 @@
+# itinerary/management/commands/build_poi_index.py
+import csv
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from itinerary import poi
+
+
+def read_csv(path):
+    """Rows of name,category,lat,lon[,rank]"""
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            yield (
+                row.get('name'),
+                row.get('category'),
+                float(row['lat']),
+                float(row['lon']),
+                int(row.get('rank') or 0),
+            )
+
+
+def read_geojson(path):
+    """Point features from a FeatureCollection or newline-delimited GeoJSON"""
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.geojsonl') or path.endswith('.ndjson'):
+            features = (json.loads(line) for line in f if line.strip())
+        else:
+            features = json.load(f).get('features', [])
+
+        for feature in features:
+            geometry = feature.get('geometry') or {}
+            if geometry.get('type') != 'Point':
+                continue
+            lon, lat = geometry['coordinates'][:2]
+            properties = feature.get('properties', {})
+            categories = properties.get('categories') or [properties.get('category')]
+            rank = properties.get('rank')
+            if rank is None and properties.get('importance') is not None:
+                # OSM/Nominatim importance is a 0..1 float.
+                rank = float(properties['importance']) * 1000
+            # One row per category; build_index stores the place itself once.
+            for category in categories:
+                yield properties.get('name'), category, lat, lon, int(rank or 0)
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the local POI index used for attraction and hotel lookups from "
+        "an OSM-style extract (.csv, .geojson, .geojsonl or .ndjson)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('extract', help="Path to the extract file")
+        parser.add_argument('--output', default=None,
+                            help="Index path (defaults to POI_INDEX_PATH)")
+
+    def handle(self, *args, **options):
+        path = options['extract']
+        output = options['output'] or settings.POI_INDEX_PATH
+        if not output:
+            raise CommandError("Set POI_INDEX_PATH or pass --output.")
+
+        reader = read_csv if path.endswith('.csv') else read_geojson
+        started = time.monotonic()
+        try:
+            count = poi.build_index(reader(path), str(output))
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Could not build index from {path}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {count} places into {output} in {time.monotonic() - started:.1f}s."
+        ))
@@ -0,0 +1,26 @@
+# itinerary/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from itinerary import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the SQLite FTS5 trip search index from the Trip table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Trips indexed per batch")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("Full-text search needs SQLite; other databases use the built-in fallback.")
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(search.create_table_sql())
+            count = search.rebuild(batch_size=options['batch_size'])
+            with connection.cursor() as cursor:
+                cursor.execute(f"INSERT INTO {search.TABLE}({search.TABLE}) VALUES ('optimize')")
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} trip(s) for search."))
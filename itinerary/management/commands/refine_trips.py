@@ -0,0 +1,56 @@
+# itinerary/management/commands/refine_trips.py
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from itinerary import providers, ratelimit, refinement
+from itinerary.models import Trip
+from itinerary.views import generate_itinerary_with_ai
+
+
+class Command(BaseCommand):
+    help = (
+        "Finish upcoming trips an import or a busy AI queue left incomplete: re-run "
+        "destination lookups that failed and queue AI itineraries for trips still "
+        "on a quick plan, within the 'openrouter_background' rate limit. Schedule "
+        "it, e.g. cron: */10 * * * * python manage.py refine_trips"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-trips', type=int, default=200,
+                            help="Upper bound on AI itineraries queued by this run")
+
+    def handle(self, *args, **options):
+        upcoming = Trip.objects.filter(end_date__gte=timezone.localdate(), is_booked=False)
+
+        # Trips whose lookup failed never got a weather line.
+        enriched = 0
+        destinations = {}
+        for trip in upcoming.filter(weather='').order_by('created_at').iterator():
+            destinations.setdefault(providers.normalize_destination(trip.destination), []).append(trip)
+        for trips in destinations.values():
+            try:
+                fields = providers.enrich_destination(trips[0].destination)
+            except ratelimit.RateLimited as e:
+                self.stderr.write(f"  Destination lookups paused: {e}")
+                break
+            except Exception as e:
+                self.stderr.write(f"  {trips[0].destination}: {e}")
+                continue
+            for trip in trips:
+                for field, value in fields.items():
+                    setattr(trip, field, value)
+                trip.save(update_fields=list(fields))
+            enriched += len(trips)
+
+        queued = 0
+        waiting = upcoming.filter(itinerary_source=Trip.ITINERARY_RULES).order_by('created_at')
+        for trip in waiting[:options['max_trips']].iterator():
+            if refinement.pending(trip.pk):
+                continue
+            if ratelimit.take('openrouter_background') or not refinement.submit(trip, generate_itinerary_with_ai):
+                break
+            queued += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Filled destination data for {enriched} trip(s); queued {queued} AI itinerary(ies)."
+        ))
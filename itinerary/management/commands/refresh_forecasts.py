@@ -0,0 +1,57 @@
+# itinerary/management/commands/refresh_forecasts.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from itinerary import providers
+from itinerary.models import Trip, WeatherForecast
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh the shared per-destination daily forecasts for upcoming trips, "
+        "one forecast call per destination. Schedule it, e.g. cron: "
+        "0 */3 * * * python manage.py refresh_forecasts"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-calls', type=int, default=500,
+                            help="Upper bound on forecast calls for this run")
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        horizon = today + timedelta(days=settings.FORECAST_DAYS)
+
+        destinations = {}
+        upcoming = (
+            Trip.objects.filter(start_date__lte=horizon, end_date__gte=today)
+            .values_list('destination', flat=True)
+            .distinct()
+        )
+        for destination in upcoming.iterator():
+            destinations.setdefault(providers.normalize_destination(destination), destination)
+
+        refreshed = 0
+        for key, destination in list(destinations.items())[:options['max_calls']]:
+            try:
+                days = providers.daily_forecast(destination)
+            except Exception as e:
+                self.stderr.write(f"  {destination}: {e}")
+                continue
+            if not days:
+                self.stderr.write(f"  {destination}: no forecast available")
+                continue
+
+            for day, forecast in days.items():
+                WeatherForecast.objects.update_or_create(
+                    destination=key, date=day, defaults=forecast
+                )
+            refreshed += 1
+
+        expired, _ = WeatherForecast.objects.filter(date__lt=today).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed forecasts for {refreshed}/{len(destinations)} destinations; "
+            f"removed {expired} past forecasts."
+        ))
@@ -0,0 +1,108 @@
+# itinerary/management/commands/warm_provider_cache.py
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from itinerary import providers
+from itinerary.models import PlanCacheStats, Trip
+
+# weather + attractions + hotels + route
+CALLS_PER_DESTINATION = 4
+
+
+class Command(BaseCommand):
+    help = (
+        "Pre-fetch weather, attractions, hotels and coordinates for the most "
+        "planned destinations, then report yesterday's plan cache coverage. "
+        "Needs a shared CACHE_BACKEND to warm the web workers' cache. "
+        "Schedule it before morning traffic, e.g. cron: "
+        "30 5 * * * python manage.py warm_provider_cache"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30,
+                            help="Rank destinations planned in the last N days")
+        parser.add_argument('--top', type=int, default=50,
+                            help="Number of destinations to warm")
+        parser.add_argument('--max-calls', type=int, default=200,
+                            help="Upper bound on upstream provider calls for this run")
+        parser.add_argument('--rate', type=float, default=2.0,
+                            help="Upstream provider calls per second")
+        parser.add_argument('--report-only', action='store_true',
+                            help="Only print the coverage report")
+
+    def handle(self, *args, **options):
+        self.report_coverage(timezone.localdate() - timedelta(days=1))
+        if options['report_only']:
+            return
+
+        destinations = self.popular_destinations(options['days'], options['top'])
+        if not destinations:
+            self.stdout.write("No destinations planned in the window, nothing to warm.")
+            return
+
+        started = time.monotonic()
+        warmed = 0
+        calls_before = providers.upstream_call_count()
+        for destination in destinations:
+            used = providers.upstream_call_count() - calls_before
+            if used + CALLS_PER_DESTINATION > options['max_calls']:
+                self.stdout.write(self.style.WARNING(
+                    f"Call budget of {options['max_calls']} reached, stopping."
+                ))
+                break
+
+            try:
+                fields = providers.enrich_destination(destination, refresh=True)
+            except Exception as e:
+                self.stderr.write(f"  {destination}: {e}")
+            else:
+                warmed += 1
+                self.stdout.write(f"  {destination}: {fields.get('weather', '-')}")
+
+            # Spread calls out so the run never exceeds --rate.
+            used = providers.upstream_call_count() - calls_before
+            wait = used / options['rate'] - (time.monotonic() - started)
+            if wait > 0:
+                time.sleep(wait)
+
+        used = providers.upstream_call_count() - calls_before
+        self.stdout.write(self.style.SUCCESS(
+            f"Warmed {warmed}/{len(destinations)} destinations with {used} upstream calls."
+        ))
+
+    def popular_destinations(self, days, top):
+        """Most planned destinations, merged by normalized name"""
+        since = timezone.now() - timedelta(days=days)
+        rows = (
+            Trip.objects.filter(created_at__gte=since)
+            .values('destination')
+            .annotate(trips=Count('id'))
+        )
+
+        counts = Counter()
+        spelling = {}
+        for row in rows:
+            key = providers.normalize_destination(row['destination'])
+            if not key:
+                continue
+            counts[key] += row['trips']
+            # Query with the most common spelling users actually typed.
+            if row['trips'] > spelling.get(key, ('', 0))[1]:
+                spelling[key] = (row['destination'], row['trips'])
+
+        return [spelling[key][0] for key, _ in counts.most_common(top)]
+
+    def report_coverage(self, day):
+        stats = PlanCacheStats.objects.filter(day=day).first()
+        if stats is None or not stats.plan_requests:
+            self.stdout.write(f"Coverage for {day}: no plan requests recorded.")
+            return
+        self.stdout.write(
+            f"Coverage for {day}: {stats.cache_hits}/{stats.plan_requests} "
+            f"plan requests served from cache ({stats.coverage:.1%})."
+        )
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('itinerary', '0002_trip_booking_reference_trip_is_booked_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanCacheStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('plan_requests', models.PositiveIntegerField(default=0)),
+                ('cache_hits', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('itinerary', '0003_plancachestats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DestinationStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('destination', models.CharField(max_length=100, unique=True)),
+                ('name', models.CharField(max_length=100)),
+                ('trips', models.IntegerField(default=0)),
+                ('booked_trips', models.IntegerField(default=0)),
+                ('budget_total', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('budget_trips', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'destination stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyDestinationStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('trips', models.IntegerField(default=0)),
+                ('booked_trips', models.IntegerField(default=0)),
+                ('destination', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily', to='itinerary.destinationstats')),
+            ],
+            options={
+                'verbose_name_plural': 'daily destination stats',
+                'indexes': [models.Index(fields=['day'], name='itinerary_d_day_6c320d_idx')],
+                'constraints': [models.UniqueConstraint(fields=('destination', 'day'), name='unique_destination_day')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('itinerary', '0004_destinationstats_dailydestinationstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeatherForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('destination', models.CharField(max_length=100)),
+                ('date', models.DateField()),
+                ('temp_min', models.FloatField()),
+                ('temp_max', models.FloatField()),
+                ('description', models.CharField(max_length=100)),
+                ('fetched_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('destination', 'date'), name='unique_destination_forecast_date')],
+            },
+        ),
+    ]
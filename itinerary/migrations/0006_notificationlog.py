@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('itinerary', '0005_weatherforecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(max_length=30)),
+                ('status', models.CharField(choices=[('sent', 'Sent'), ('failed', 'Failed'), ('skipped', 'Skipped')], max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('duration_ms', models.PositiveIntegerField(default=0)),
+                ('detail', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='itinerary.trip')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('itinerary', '0006_notificationlog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trip',
+            name='itinerary_source',
+            field=models.CharField(blank=True, choices=[('ai', 'AI'), ('rules', 'Quick plan')], max_length=10),
+        ),
+    ]
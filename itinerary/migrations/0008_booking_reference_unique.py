@@ -0,0 +1,89 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:47
+
+import hashlib
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copy of itinerary.references as of this migration, so later changes
+# to the live scheme don't change what it writes.
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+
+def _permute(value, prefix):
+    key = hashlib.sha256(f"{settings.BOOKING_REFERENCE_KEY}:{prefix}".encode()).digest()
+    left, right = value >> 16, value & 0xFFFF
+    for number in range(4):
+        digest = hashlib.blake2b(f"{number}:{right}".encode(), key=key, digest_size=2).digest()
+        left, right = right, left ^ int.from_bytes(digest, "big")
+    return (left << 16) | right
+
+
+def make(prefix, trip_id):
+    high, low = divmod(trip_id, 1 << 32)
+    value = (high << 32) | _permute(low, prefix)
+    chars = []
+    while value:
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return prefix + "".join(reversed(chars)).rjust(7, "0")
+
+
+def dedupe_and_backfill(apps, schema_editor):
+    """
+    Blank references become NULL so they don't clash under the unique index.
+    The oldest trip keeps a duplicated reference; later ones get a new one.
+    Every trip with a reference gets its ticket ID.
+    """
+    Trip = apps.get_model('itinerary', 'Trip')
+    Trip.objects.filter(booking_reference='').update(booking_reference=None)
+
+    seen = set()
+    batch = []
+    trips = Trip.objects.exclude(booking_reference=None).order_by('id').only('id', 'booking_reference', 'ticket_id')
+    for trip in trips.iterator():
+        if trip.booking_reference in seen:
+            trip.booking_reference = make('TRP', trip.id)
+        seen.add(trip.booking_reference)
+        trip.ticket_id = make('TKT', trip.id)
+        batch.append(trip)
+        if len(batch) >= 1000:
+            Trip.objects.bulk_update(batch, ['booking_reference', 'ticket_id'])
+            batch = []
+    Trip.objects.bulk_update(batch, ['booking_reference', 'ticket_id'])
+
+
+def restore_blank_references(apps, schema_editor):
+    Trip = apps.get_model('itinerary', 'Trip')
+    Trip.objects.filter(booking_reference=None).update(booking_reference='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('itinerary', '0007_trip_itinerary_source'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trip',
+            name='ticket_id',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+        migrations.AlterField(
+            model_name='trip',
+            name='booking_reference',
+            field=models.CharField(blank=True, max_length=20, null=True),
+        ),
+        migrations.RunPython(dedupe_and_backfill, restore_blank_references),
+        migrations.AlterField(
+            model_name='trip',
+            name='ticket_id',
+            field=models.CharField(blank=True, max_length=20, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='trip',
+            name='booking_reference',
+            field=models.CharField(blank=True, max_length=20, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('itinerary', '0008_booking_reference_unique'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTrip',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('destination', models.CharField(max_length=100)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('budget', models.DecimalField(blank=True, decimal_places=2, max_digits=15, null=True)),
+                ('is_booked', models.BooleanField(default=False)),
+                ('booking_reference', models.CharField(blank=True, max_length=20, null=True, unique=True)),
+                ('ticket_id', models.CharField(blank=True, max_length=20, null=True, unique=True)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('payload', models.BinaryField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_trips', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-end_date'], name='itinerary_a_user_id_a58660_idx')],
+            },
+        ),
+    ]
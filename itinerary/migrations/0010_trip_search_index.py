@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-19 01:05
+
+from django.db import migrations
+
+from itinerary import search
+
+# The table layout as of this migration; 0012 replaces it.
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS itinerary_trip_fts USING fts5(user_id UNINDEXED, "
+    "destination, interests, attractions, hotels, activities, tokenize='porter unicode61')"
+)
+INSERT_SQL = (
+    "INSERT INTO itinerary_trip_fts (rowid, user_id, destination, interests, attractions, hotels, activities) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s)"
+)
+
+
+def create_search_index(apps, schema_editor):
+    """FTS5 is SQLite-only; other databases use search.py's fallback."""
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    Trip = apps.get_model('itinerary', 'Trip')
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_SQL)
+        batch = []
+        for trip in Trip.objects.iterator(chunk_size=500):
+            batch.append((trip.pk, trip.user_id, *search.document(trip)))
+            if len(batch) >= 500:
+                cursor.executemany(INSERT_SQL, batch)
+                batch = []
+        cursor.executemany(INSERT_SQL, batch)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS itinerary_trip_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('itinerary', '0009_archivedtrip'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-19 00:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('itinerary', '0010_trip_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TripShare',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('revoked_at', models.DateTimeField(blank=True, null=True)),
+                ('html', models.TextField()),
+                ('etag', models.CharField(max_length=64)),
+                ('rendered_at', models.DateTimeField()),
+                ('trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shares', to='itinerary.trip')),
+            ],
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.8 on 2026-10-19 01:10
+
+from django.db import migrations
+
+from itinerary import search
+
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE itinerary_trip_fts USING fts5(owner, "
+    "destination, interests, attractions, hotels, activities, tokenize='porter unicode61')"
+)
+INSERT_SQL = (
+    "INSERT INTO itinerary_trip_fts (rowid, owner, destination, interests, attractions, hotels, activities) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s)"
+)
+OLD_CREATE_SQL = (
+    "CREATE VIRTUAL TABLE itinerary_trip_fts USING fts5(user_id UNINDEXED, "
+    "destination, interests, attractions, hotels, activities, tokenize='porter unicode61')"
+)
+OLD_INSERT_SQL = (
+    "INSERT INTO itinerary_trip_fts (rowid, user_id, destination, interests, attractions, hotels, activities) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s)"
+)
+
+
+def _recreate(apps, schema_editor, create_sql, insert_sql, owner):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    Trip = apps.get_model('itinerary', 'Trip')
+    with connection.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS itinerary_trip_fts")
+        cursor.execute(create_sql)
+        batch = []
+        for trip in Trip.objects.iterator(chunk_size=500):
+            batch.append((trip.pk, owner(trip.user_id), *search.document(trip)))
+            if len(batch) >= 500:
+                cursor.executemany(insert_sql, batch)
+                batch = []
+        cursor.executemany(insert_sql, batch)
+
+
+def index_owner_token(apps, schema_editor):
+    """Rebuild the index with the owner as a searchable "u<id>" token."""
+    _recreate(apps, schema_editor, CREATE_SQL, INSERT_SQL, lambda user_id: f"u{user_id}")
+
+
+def unindex_owner(apps, schema_editor):
+    _recreate(apps, schema_editor, OLD_CREATE_SQL, OLD_INSERT_SQL, lambda user_id: user_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('itinerary', '0011_tripshare'),
+    ]
+
+    operations = [
+        migrations.RunPython(index_owner_token, unindex_owner),
+    ]
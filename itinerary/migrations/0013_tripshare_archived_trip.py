@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-19 01:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('itinerary', '0012_trip_search_owner_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tripshare',
+            name='archived_trip',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='shares', to='itinerary.archivedtrip'),
+        ),
+        migrations.AlterField(
+            model_name='tripshare',
+            name='trip',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='shares', to='itinerary.trip'),
+        ),
+    ]
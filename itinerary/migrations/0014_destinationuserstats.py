@@ -0,0 +1,72 @@
+# Generated by Django 5.2.8 on 2026-10-19 01:22
+
+import re
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def _normalize(destination):
+    # providers.normalize_destination as of this migration
+    destination = re.sub(r"\s+", " ", (destination or "").strip().lower())
+    return re.sub(r"\s*,\s*", ", ", destination).strip(", ")
+
+
+def count_users(apps, schema_editor):
+    """Per-user trip counts for destinations the rollups already track"""
+    Trip = apps.get_model('itinerary', 'Trip')
+    ArchivedTrip = apps.get_model('itinerary', 'ArchivedTrip')
+    DestinationStats = apps.get_model('itinerary', 'DestinationStats')
+    DestinationUserStats = apps.get_model('itinerary', 'DestinationUserStats')
+
+    ids = dict(DestinationStats.objects.values_list('destination', 'id'))
+    per_user = {}
+    for model in (Trip, ArchivedTrip):
+        for row in model.objects.values('destination', 'user_id').annotate(trips=Count('id')).order_by().iterator():
+            stats_id = ids.get(_normalize(row['destination']))
+            if stats_id is not None:
+                key = (stats_id, row['user_id'])
+                per_user[key] = per_user.get(key, 0) + row['trips']
+
+    DestinationUserStats.objects.bulk_create(
+        (DestinationUserStats(destination_id=stats_id, user_id=user_id, trips=trips)
+         for (stats_id, user_id), trips in per_user.items()),
+        batch_size=1000,
+    )
+    users = {}
+    for stats_id, _ in per_user:
+        users[stats_id] = users.get(stats_id, 0) + 1
+    for stats_id, count in users.items():
+        DestinationStats.objects.filter(pk=stats_id).update(users=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('itinerary', '0013_tripshare_archived_trip'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='destinationstats',
+            name='users',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='DestinationUserStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trips', models.IntegerField(default=0)),
+                ('destination', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_counts', to='itinerary.destinationstats')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'destination user stats',
+                'constraints': [models.UniqueConstraint(fields=('destination', 'user'), name='unique_destination_user')],
+            },
+        ),
+        migrations.RunPython(count_users, migrations.RunPython.noop),
+    ]
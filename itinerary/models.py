@@ -1,8 +1,15 @@
 from django.db import models
+from django.db.models import F
 from django.contrib.auth.models import User
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
+import json
 import random
 import string
+import zlib
+
+from . import references
 
 class UserOTP(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -15,6 +22,15 @@ class UserOTP(models.Model):
         return self.otp
 
 class Trip(models.Model):
+    # Where the saved itinerary came from; rule-based plans are replaced by
+    # the AI result once it arrives (see refinement.py).
+    ITINERARY_AI = 'ai'
+    ITINERARY_RULES = 'rules'
+    ITINERARY_SOURCE_CHOICES = [
+        (ITINERARY_AI, 'AI'),
+        (ITINERARY_RULES, 'Quick plan'),
+    ]
+
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     destination = models.CharField(max_length=100)
     start_date = models.DateField()
@@ -26,10 +42,12 @@ class Trip(models.Model):
     hotels = models.TextField(blank=True)
     attractions = models.TextField(blank=True)
     itinerary = models.TextField(blank=True)
+    itinerary_source = models.CharField(max_length=10, choices=ITINERARY_SOURCE_CHOICES, blank=True)
     distance_km = models.FloatField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     is_booked = models.BooleanField(default=False)
-    booking_reference = models.CharField(max_length=20, blank=True)
+    booking_reference = models.CharField(max_length=20, unique=True, null=True, blank=True)
+    ticket_id = models.CharField(max_length=20, unique=True, null=True, blank=True)
     tickets_sent = models.BooleanField(default=False)
     whatsapp_sent = models.BooleanField(default=False)
     phone_number = models.CharField(max_length=15, blank=True)  # Add phone number field
@@ -47,11 +65,271 @@ class Trip(models.Model):
         return "Not specified"
 
     def generate_booking_reference(self):
-        """Generate unique booking reference"""
-        if not self.booking_reference:
-            self.booking_reference = f"TRP{self.id:06d}{random.randint(1000, 9999)}"
-            self.save()
+        """Assign the booking reference and ticket ID, both unique per trip id (see references.py)"""
+        if not (self.booking_reference and self.ticket_id):
+            self.booking_reference = self.booking_reference or references.booking_reference(self.id)
+            self.ticket_id = self.ticket_id or references.ticket_id(self.id)
+            self.save(update_fields=['booking_reference', 'ticket_id'])
         return self.booking_reference
 
     def __str__(self):
-        return f"{self.destination} - {self.user.username}"
\ No newline at end of file
+        return f"{self.destination} - {self.user.username}"
+
+class PlanCacheStats(models.Model):
+    """Daily count of trip-plan enrichments and how many were fully served from cache"""
+    day = models.DateField(unique=True)
+    plan_requests = models.PositiveIntegerField(default=0)
+    cache_hits = models.PositiveIntegerField(default=0)
+
+    @classmethod
+    def record(cls, hit):
+        stats, _ = cls.objects.get_or_create(day=timezone.localdate())
+        cls.objects.filter(pk=stats.pk).update(
+            plan_requests=F('plan_requests') + 1,
+            cache_hits=F('cache_hits') + (1 if hit else 0),
+        )
+
+    @property
+    def coverage(self):
+        if self.plan_requests:
+            return self.cache_hits / self.plan_requests
+        return 0.0
+
+    def __str__(self):
+        return f"{self.day}: {self.cache_hits}/{self.plan_requests} cached"
+
+
+class DestinationStats(models.Model):
+    """Running per-destination totals, kept current by the signals in rollups.py"""
+    destination = models.CharField(max_length=100, unique=True)
+    name = models.CharField(max_length=100)
+    trips = models.IntegerField(default=0)
+    booked_trips = models.IntegerField(default=0)
+    budget_total = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    budget_trips = models.IntegerField(default=0)
+    users = models.IntegerField(default=0)  # distinct users with a trip here
+
+    class Meta:
+        verbose_name_plural = "destination stats"
+
+    @property
+    def conversion_rate(self):
+        if self.trips:
+            return self.booked_trips / self.trips
+        return 0.0
+
+    @property
+    def average_budget(self):
+        if self.budget_trips:
+            return self.budget_total / self.budget_trips
+        return None
+
+    def __str__(self):
+        return self.name
+
+
+class DailyDestinationStats(models.Model):
+    """Trips planned and booked per destination per day of planning"""
+    destination = models.ForeignKey(DestinationStats, on_delete=models.CASCADE, related_name='daily')
+    day = models.DateField()
+    trips = models.IntegerField(default=0)
+    booked_trips = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "daily destination stats"
+        constraints = [
+            models.UniqueConstraint(fields=['destination', 'day'], name='unique_destination_day'),
+        ]
+        indexes = [
+            models.Index(fields=['day']),
+        ]
+
+    def __str__(self):
+        return f"{self.destination} on {self.day}"
+
+
+class DestinationUserStats(models.Model):
+    """How many trips one user has to a destination; backs DestinationStats.users"""
+    destination = models.ForeignKey(DestinationStats, on_delete=models.CASCADE, related_name='user_counts')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    trips = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "destination user stats"
+        constraints = [
+            models.UniqueConstraint(fields=['destination', 'user'], name='unique_destination_user'),
+        ]
+
+    def __str__(self):
+        return f"{self.destination} for user {self.user_id}"
+
+
+class WeatherForecast(models.Model):
+    """Daily forecast for a normalized destination, shared by every trip going there"""
+    destination = models.CharField(max_length=100)
+    date = models.DateField()
+    temp_min = models.FloatField()
+    temp_max = models.FloatField()
+    description = models.CharField(max_length=100)
+    fetched_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['destination', 'date'], name='unique_destination_forecast_date'),
+        ]
+
+    @property
+    def summary(self):
+        return f"{self.temp_min:.0f}–{self.temp_max:.0f}°C, {self.description}"
+
+    def __str__(self):
+        return f"{self.destination} on {self.date}: {self.summary}"
+
+
+class NotificationLog(models.Model):
+    """One delivery attempt series per channel per dispatch (see notifications.py)"""
+    SENT = 'sent'
+    FAILED = 'failed'
+    SKIPPED = 'skipped'
+    STATUS_CHOICES = [
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+        (SKIPPED, 'Skipped'),
+    ]
+
+    trip = models.ForeignKey(Trip, on_delete=models.CASCADE, related_name='notifications')
+    channel = models.CharField(max_length=30)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    duration_ms = models.PositiveIntegerField(default=0)
+    detail = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.channel} {self.status} for trip {self.trip_id}"
+
+
+class ArchivedTrip(models.Model):
+    """
+    A past trip moved out of Trip by the archive_trips command. Only what
+    lists, reference lookups and rollups need is kept in columns; the rest of
+    the trip and its notification log is zlib-compressed JSON in `payload`.
+    """
+    PAYLOAD_FIELDS = (
+        'travelers', 'interests', 'weather', 'hotels', 'attractions', 'itinerary',
+        'itinerary_source', 'distance_km', 'tickets_sent', 'whatsapp_sent', 'phone_number',
+    )
+
+    id = models.BigIntegerField(primary_key=True)  # the original Trip id
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_trips')
+    destination = models.CharField(max_length=100)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    budget = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)
+    is_booked = models.BooleanField(default=False)
+    booking_reference = models.CharField(max_length=20, unique=True, null=True, blank=True)
+    ticket_id = models.CharField(max_length=20, unique=True, null=True, blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    payload = models.BinaryField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-end_date']),
+        ]
+
+    @classmethod
+    def from_trip(cls, trip):
+        """Unsaved archive row for `trip`; prefetch trip.notifications when archiving many"""
+        data = {field: getattr(trip, field) for field in cls.PAYLOAD_FIELDS}
+        data['notifications'] = [
+            {
+                'channel': log.channel,
+                'status': log.status,
+                'attempts': log.attempts,
+                'duration_ms': log.duration_ms,
+                'detail': log.detail,
+                'created_at': log.created_at,
+            }
+            for log in trip.notifications.all()
+        ]
+        return cls(
+            id=trip.id,
+            user_id=trip.user_id,
+            destination=trip.destination,
+            start_date=trip.start_date,
+            end_date=trip.end_date,
+            budget=trip.budget,
+            is_booked=trip.is_booked,
+            booking_reference=trip.booking_reference,
+            ticket_id=trip.ticket_id,
+            created_at=trip.created_at,
+            payload=zlib.compress(json.dumps(data, cls=DjangoJSONEncoder).encode(), 9),
+        )
+
+    @property
+    def data(self):
+        return json.loads(zlib.decompress(self.payload))
+
+    def to_trip(self):
+        """An unsaved Trip with the archived values, for read-only display"""
+        data = self.data
+        data.pop('notifications', None)
+        return Trip(
+            id=self.id,
+            user_id=self.user_id,
+            destination=self.destination,
+            start_date=self.start_date,
+            end_date=self.end_date,
+            budget=self.budget,
+            is_booked=self.is_booked,
+            booking_reference=self.booking_reference,
+            ticket_id=self.ticket_id,
+            created_at=self.created_at,
+            **data,
+        )
+
+    def __str__(self):
+        return f"{self.destination} (archived)"
+
+
+class TripShare(models.Model):
+    """
+    A public, read-only link to a trip. The page is rendered once into `html`
+    and re-rendered only when the trip changes (see sharing.py); the link
+    token is the signed share id, so links can't be guessed or enumerated.
+    archive_trips moves links to the ArchivedTrip, so they keep serving the
+    last snapshot; deleting either trip row deletes its links.
+    """
+    TOKEN_SALT = 'itinerary.TripShare'
+
+    trip = models.ForeignKey(Trip, on_delete=models.CASCADE, related_name='shares', null=True, blank=True)
+    archived_trip = models.ForeignKey(ArchivedTrip, on_delete=models.CASCADE, related_name='shares',
+                                      null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    revoked_at = models.DateTimeField(null=True, blank=True)
+    html = models.TextField()
+    etag = models.CharField(max_length=64)
+    rendered_at = models.DateTimeField()
+
+    @property
+    def token(self):
+        return signing.Signer(salt=self.TOKEN_SALT).sign(str(self.pk))
+
+    @classmethod
+    def id_from_token(cls, token):
+        """The share id a token was signed for, or None if it was tampered with"""
+        try:
+            return int(signing.Signer(salt=cls.TOKEN_SALT).unsign(token))
+        except (signing.BadSignature, ValueError):
+            return None
+
+    @property
+    def trip_pk(self):
+        return self.trip_id or self.archived_trip_id
+
+    def __str__(self):
+        return f"Share of trip {self.trip_pk}"
@@ -0,0 +1,247 @@
+# itinerary/notifications.py
+"""
+Booking notifications fanned out concurrently over pluggable channels.
+
+Channels are configured in settings.NOTIFICATION_CHANNELS, in the same spirit
+as EMAIL_BACKEND: each entry names a backend class plus its worker pool size
+and retry count. dispatch() sends on every channel at once, so booking takes
+as long as the slowest channel rather than the sum of all of them, and
+records one NotificationLog row per channel.
+"""
+import logging
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db import connections
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+from django.utils.module_loading import import_string
+
+from .models import NotificationLog
+
+logger = logging.getLogger(__name__)
+
+# Messages handed to LocmemChannel, for tests and local development.
+outbox = []
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class NotificationSkipped(Exception):
+    """The channel does not apply to this trip (e.g. no phone number)."""
+
+
+class Delivery:
+    def __init__(self, channel, status, detail="", attempts=0, duration_ms=0):
+        self.channel = channel
+        self.status = status
+        self.detail = detail
+        self.attempts = attempts
+        self.duration_ms = duration_ms
+
+    @property
+    def ok(self):
+        return self.status == NotificationLog.SENT
+
+
+def generate_ticket_data(trip, itinerary):
+    """Generate ticket data for email and WhatsApp"""
+    itinerary = itinerary or {}
+    booking_ref = trip.generate_booking_reference()
+
+    ticket_data = {
+        'booking_reference': booking_ref,
+        'destination': trip.destination,
+        'traveler_name': trip.user.username,
+        'traveler_email': trip.user.email,
+        'start_date': trip.start_date,
+        'end_date': trip.end_date,
+        'duration': trip.duration_days,
+        'travelers': trip.travelers,
+        'total_cost': trip.formatted_budget,
+        'itinerary_summary': itinerary.get('summary', {}),
+        'daily_plans': itinerary.get('itinerary', []),
+        'booking_date': timezone.now().strftime("%Y-%m-%d %H:%M"),
+        'ticket_id': trip.ticket_id,
+    }
+    return ticket_data
+
+
+class NotificationChannel:
+    """Base channel. send() returns a detail string or raises on failure."""
+
+    def __init__(self, name, **options):
+        self.name = name
+        self.options = options
+
+    def send(self, trip, itinerary, ticket):
+        raise NotImplementedError
+
+
+class EmailChannel(NotificationChannel):
+    """HTML ticket email"""
+
+    def send(self, trip, itinerary, ticket):
+        html_content = render_to_string('ticket_email.html', {
+            'trip': trip,
+            'ticket': ticket,
+            'itinerary': itinerary
+        })
+        text_content = strip_tags(html_content)
+        subject = f"🎫 Your Travel Ticket to {trip.destination} - {ticket['booking_reference']}"
+
+        email = EmailMultiAlternatives(
+            subject=subject,
+            body=text_content,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[trip.user.email],
+            reply_to=[settings.DEFAULT_FROM_EMAIL]
+        )
+        email.attach_alternative(html_content, "text/html")
+        email.send(fail_silently=False)
+        return f"sent to {trip.user.email}"
+
+
+def normalize_phone(phone_number):
+    phone_number = ''.join(filter(str.isdigit, phone_number or ''))
+    if not phone_number.startswith('91') and len(phone_number) == 10:
+        phone_number = '91' + phone_number
+    return phone_number
+
+
+class WhatsAppLinkChannel(NotificationChannel):
+    """Builds a wa.me click-to-send link; the detail is the link itself"""
+
+    def send(self, trip, itinerary, ticket):
+        phone_number = normalize_phone(trip.phone_number)
+        if not phone_number:
+            raise NotificationSkipped("no phone number")
+
+        message = f"""🎫 *Travel Booking Confirmed!*
+
+*Booking Reference:* {ticket['booking_reference']}
+*Destination:* {trip.destination}
+*Travel Dates:* {trip.start_date} to {trip.end_date}
+*Duration:* {trip.duration_days} days
+*Travelers:* {trip.travelers}
+*Total Budget:* {trip.formatted_budget}
+
+Your detailed itinerary has been sent to your email: {trip.user.email}
+
+Thank you for choosing TravelPlanner! 🌍
+
+_This is an automated message. Please do not reply._"""
+
+        return f"https://wa.me/{phone_number}?text={urllib.parse.quote(message)}"
+
+
+class ConsoleSMSChannel(NotificationChannel):
+    """Stand-in SMS backend that only logs the message"""
+
+    def send(self, trip, itinerary, ticket):
+        if not trip.phone_number:
+            raise NotificationSkipped("no phone number")
+        logger.info("SMS to %s: booking %s confirmed", trip.phone_number, ticket['booking_reference'])
+        return f"logged for {trip.phone_number}"
+
+
+class LocmemChannel(NotificationChannel):
+    """Stub backend that appends to notifications.outbox; can be told to fail"""
+
+    def send(self, trip, itinerary, ticket):
+        if self.options.get('FAIL'):
+            raise RuntimeError(f"{self.name} stub configured to fail")
+        time.sleep(self.options.get('DELAY', 0))
+        outbox.append({'channel': self.name, 'trip_id': trip.id, 'ticket': ticket})
+        return f"stored in outbox as #{len(outbox)}"
+
+
+def get_channel(name):
+    config = settings.NOTIFICATION_CHANNELS[name]
+    options = {k: v for k, v in config.items() if k not in ('BACKEND', 'WORKERS', 'RETRIES')}
+    return import_string(config['BACKEND'])(name, **options)
+
+
+def _get_pool(name):
+    pool = _pools.get(name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(name)
+            if pool is None:
+                workers = settings.NOTIFICATION_CHANNELS[name].get('WORKERS', 2)
+                pool = _pools[name] = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix=f"notify-{name}"
+                )
+    return pool
+
+
+def _deliver(name, trip, itinerary, ticket):
+    """Send on one channel with retries; runs on the channel's worker pool"""
+    retries = settings.NOTIFICATION_CHANNELS[name].get('RETRIES', 0)
+    started = time.monotonic()
+    attempts = 0
+    try:
+        channel = get_channel(name)
+        while True:
+            attempts += 1
+            try:
+                detail = channel.send(trip, itinerary, ticket)
+                status = NotificationLog.SENT
+                break
+            except NotificationSkipped as e:
+                detail, status = str(e), NotificationLog.SKIPPED
+                break
+            except Exception as e:
+                logger.warning("%s notification for trip %s failed (attempt %s): %s", name, trip.id, attempts, e)
+                detail, status = str(e), NotificationLog.FAILED
+                if attempts > retries:
+                    break
+                time.sleep(settings.NOTIFICATION_RETRY_DELAY * 2 ** (attempts - 1))
+    finally:
+        # Channels should not touch the database, but never leak a connection
+        # from a long-lived pool thread if one does.
+        connections.close_all()
+
+    return Delivery(name, status, detail or "", attempts, int((time.monotonic() - started) * 1000))
+
+
+def dispatch(trip, itinerary, channels=None, ticket=None):
+    """
+    Send the booking on `channels` (default: all configured) concurrently and
+    write the delivery log. Returns {channel name: Delivery}.
+    """
+    channels = list(channels or settings.NOTIFICATION_CHANNELS)
+    if ticket is None:
+        # Built here, on the request thread: it may save the booking reference
+        # and loads trip.user, so channel threads need no database access.
+        ticket = generate_ticket_data(trip, itinerary)
+
+    futures = {
+        name: _get_pool(name).submit(_deliver, name, trip, itinerary, ticket)
+        for name in channels
+    }
+    deliveries = {}
+    for name, future in futures.items():
+        try:
+            deliveries[name] = future.result()
+        except Exception as e:
+            deliveries[name] = Delivery(name, NotificationLog.FAILED, str(e))
+
+    NotificationLog.objects.bulk_create([
+        NotificationLog(
+            trip=trip,
+            channel=delivery.channel,
+            status=delivery.status,
+            attempts=delivery.attempts,
+            duration_ms=delivery.duration_ms,
+            detail=delivery.detail[:2000],
+        )
+        for delivery in deliveries.values()
+    ])
+    return deliveries
@@ -0,0 +1,148 @@
+# itinerary/planner.py
+"""
+Rule-based itinerary generator.
+
+Builds the same {"itinerary": [...], "summary": {...}} structure the AI
+prompt asks for, from the trip's attractions, hotels and interests. It makes
+no network calls and always gives the same plan for the same input, so it is
+used as the instant first plan and whenever the AI is unavailable.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+# Per-person daily spend assumed when the trip has no budget.
+DEFAULT_DAILY_SPEND = Decimal("2500")
+
+# Placeholder texts enrich_destination() stores when a lookup found nothing.
+NO_RESULTS = {"no attractions found", "no hotels found", "location not found", "weather data not available"}
+
+# (keywords, activity template, type) — "{place}" is filled with an attraction
+# when one is left, otherwise with the destination.
+INTEREST_ACTIVITIES = [
+    (("beach", "sea", "coast"), "Relax and swim at a beach near {place}", "beach"),
+    (("temple", "church", "mosque", "spiritual", "religious"), "Visit {place} and the nearby places of worship", "culture"),
+    (("food", "cuisine", "culinary", "street food"), "Local food trail around {place}", "food"),
+    (("adventure", "trek", "hiking", "sports"), "Outdoor adventure activity near {place}", "adventure"),
+    (("museum", "history", "heritage", "fort"), "Guided heritage walk at {place}", "history"),
+    (("nature", "wildlife", "park", "lake", "mountain"), "Nature walk at {place}", "nature"),
+    (("shopping", "market"), "Shopping at the local markets near {place}", "shopping"),
+    (("nightlife", "party", "bar"), "Evening out at {place}", "nightlife"),
+    (("art", "culture", "music", "dance"), "Arts and culture evening at {place}", "culture"),
+]
+
+SLOTS = [
+    # (time, share of the day's spend, duration)
+    ("09:00 AM", Decimal("0.25"), "3 hours"),
+    ("01:00 PM", Decimal("0.20"), "1 hour"),
+    ("03:00 PM", Decimal("0.25"), "3 hours"),
+    ("07:30 PM", Decimal("0.30"), "2 hours"),
+]
+
+
+def _names(text):
+    if not text or text.strip().lower() in NO_RESULTS:
+        return []
+    return [name.strip() for name in text.split(",") if name.strip()]
+
+
+def _rupees(amount):
+    return f"₹{amount:,.0f}"
+
+
+def _interest_activities(interests):
+    interests = (interests or "").lower()
+    matched = [
+        (template, kind) for keywords, template, kind in INTEREST_ACTIVITIES
+        if any(keyword in interests for keyword in keywords)
+    ]
+    return matched or [("Sightseeing at {place}", "sightseeing")]
+
+
+def build_itinerary(destination, days, budget=None, travelers=1, interests="",
+                    attractions="", hotels="", start_date=None, distance_km=None):
+    """Plan `days` days from what is known about the destination"""
+    days = max(int(days or 0), 1)
+    travelers = max(int(travelers or 1), 1)
+    total = Decimal(budget) if budget else DEFAULT_DAILY_SPEND * travelers * days
+    daily = total / days
+
+    places = _names(attractions) or [destination]
+    hotel_names = _names(hotels)
+    hotel = hotel_names[0] if hotel_names else f"your hotel in {destination}"
+    activities = _interest_activities(interests)
+
+    plan = []
+    for number in range(1, days + 1):
+        # Rotate through attractions and interests so consecutive days differ.
+        morning_place = places[(2 * number - 2) % len(places)]
+        afternoon_place = places[(2 * number - 1) % len(places)]
+        template, kind = activities[(number - 1) % len(activities)]
+
+        if number == 1:
+            morning = (f"Check in at {hotel} and explore {morning_place}", "sightseeing", morning_place)
+        else:
+            morning = (f"Morning visit to {morning_place}", "sightseeing", morning_place)
+        if number == days and days > 1:
+            evening = (f"Check out from {hotel} and head home", "travel", hotel)
+        else:
+            evening = (f"Dinner and evening stroll in {destination}", "food", destination)
+        entries = [
+            morning,
+            (f"Lunch at a popular local restaurant in {destination}", "food", destination),
+            (template.format(place=afternoon_place), kind, afternoon_place),
+            evening,
+        ]
+
+        day_activities = [
+            {
+                "time": time,
+                "activity": activity,
+                "location": location,
+                "cost": _rupees(daily * share),
+                "duration": duration,
+                "type": kind,
+            }
+            for (time, share, duration), (activity, kind, location) in zip(SLOTS, entries)
+        ]
+        plan.append({
+            "day": number,
+            "date": (start_date + timedelta(days=number - 1)).isoformat() if start_date else "",
+            "activities": day_activities,
+            "total_cost": _rupees(daily),
+        })
+
+    if distance_km and distance_km > 500:
+        transport = "Flight, then local taxis"
+    elif distance_km and distance_km > 150:
+        transport = "Train or intercity bus, then local taxis"
+    else:
+        transport = "Local taxis, auto-rickshaws and walking"
+
+    return {
+        "itinerary": plan,
+        "summary": {
+            "total_estimated_cost": _rupees(total),
+            "best_transportation": transport,
+            "tips": [
+                "Book popular attractions a day in advance.",
+                "Carry some cash for small shops and local transport.",
+                f"Check the weather for {destination} before heading out each day.",
+            ],
+            "must_see": places[:3],
+        },
+    }
+
+
+def build_for_trip(trip):
+    """build_itinerary() from a Trip's saved details"""
+    return build_itinerary(
+        destination=trip.destination,
+        days=trip.duration_days,
+        budget=trip.budget,
+        travelers=trip.travelers,
+        interests=trip.interests,
+        attractions=trip.attractions,
+        hotels=trip.hotels,
+        start_date=trip.start_date,
+        distance_km=trip.distance_km,
+    )
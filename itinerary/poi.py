@@ -0,0 +1,212 @@
+# itinerary/poi.py
+"""
+Local points-of-interest index answering "top N in category near lat/lon".
+
+The index is one binary file built offline by `manage.py build_poi_index`
+from an OSM-style extract and memory-mapped at first use:
+
+    header      magic, counts, grid cell size, section offsets
+    categories  JSON list of category names ("tourism.sights", ...)
+    cell keys   sorted uint64 (category, grid cell) keys
+    cell spans  (first record, record count) per key
+    records     (lat, lon, category, rank, name offset, name length),
+                grouped by category and cell, ordered by rank within a cell
+    names       UTF-8 name bytes, stored once per place
+
+A place listed under several categories has a record in each, all pointing
+at the same name, which is how lookups spanning those categories return it
+only once. Keying cells by category means a lookup only reads records of
+the categories it asked for.
+"""
+import bisect
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+
+from django.conf import settings
+
+MAGIC = b"POI2"
+HEADER = struct.Struct("<4sIIIdQQQQQ")
+SPAN = struct.Struct("<II")
+RECORD = struct.Struct("<iiHHIH")
+
+CELL_DEG = 0.05
+EARTH_RADIUS_M = 6371000
+
+_index = None
+_index_lock = threading.Lock()
+_missing = object()
+
+
+def _cell(lat, lon, cell_deg):
+    return math.floor(lat / cell_deg), math.floor(lon / cell_deg)
+
+
+def _cell_key(category_id, cy, cx):
+    return (category_id << 48) | ((cy + 2 ** 23) << 24) | (cx + 2 ** 23)
+
+
+class POIIndex:
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.count, self.cell_count, _, self.cell_deg,
+         categories_at, keys_at, spans_at, records_at, self._names_at) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a POI index in the current format; rebuild it with build_poi_index")
+
+        view = self._view = memoryview(self._mm)
+        self.categories = json.loads(bytes(view[categories_at:keys_at]))
+        self._keys = view[keys_at:keys_at + 8 * self.cell_count].cast("Q")
+        self._spans_at = spans_at
+        self._records_at = records_at
+
+    def _category_ids(self, categories):
+        prefixes = [c.strip() for c in categories.split(",") if c.strip()]
+        return {
+            i for i, name in enumerate(self.categories)
+            if any(name == p or name.startswith(p + ".") for p in prefixes)
+        }
+
+    def nearby(self, lat, lon, categories, radius_m, limit):
+        """Names of the top `limit` places in `categories` within radius_m, best ranked first"""
+        wanted = self._category_ids(categories)
+        if not wanted:
+            return []
+
+        dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+        dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+        y0, x0 = _cell(lat - dlat, lon - dlon, self.cell_deg)
+        y1, x1 = _cell(lat + dlat, lon + dlon, self.cell_deg)
+
+        # Best match per place (name offset), as (-rank, squared distance, name length).
+        best = {}
+        for category_id in wanted:
+            for cy in range(y0, y1 + 1):
+                # The row's cells are adjacent keys, so two bisections find them all.
+                lo = bisect.bisect_left(self._keys, _cell_key(category_id, cy, x0))
+                hi = bisect.bisect_right(self._keys, _cell_key(category_id, cy, x1))
+                for i in range(lo, hi):
+                    start, count = SPAN.unpack_from(self._mm, self._spans_at + i * SPAN.size)
+                    begin = self._records_at + start * RECORD.size
+                    self._scan(self._view[begin:begin + count * RECORD.size], lat, lon, radius_m, limit, best)
+
+        matches = sorted((match, name_at) for name_at, match in best.items())
+        names_at = self._names_at
+        return [
+            self._mm[names_at + name_at:names_at + name_at + name_len].decode("utf-8")
+            for (_, _, name_len), name_at in matches[:limit]
+        ]
+
+    @staticmethod
+    def _scan(records, lat, lon, radius_m, limit, best):
+        """
+        Add a cell's matches to `best`. Records come best ranked first, so
+        the scan stops at the first rank below the cell's limit-th match:
+        nothing after it can make the overall top `limit`.
+        """
+        # Equirectangular distances (well under 1% off at city scale), squared
+        # and in micro-degrees of latitude to keep the loop cheap.
+        ulat, ulon = lat * 1e6, lon * 1e6
+        kx = math.cos(math.radians(lat))
+        metres_per_unit = math.radians(1e-6) * EARTH_RADIUS_M
+        limit_sq = (radius_m / metres_per_unit) ** 2
+        found = 0
+        cutoff = None
+        for plat, plon, _, rank, name_at, name_len in RECORD.iter_unpack(records):
+            if cutoff is not None and rank < cutoff:
+                break
+            dy = plat - ulat
+            dx = (plon - ulon) * kx
+            distance_sq = dx * dx + dy * dy
+            if distance_sq > limit_sq:
+                continue
+            match = (-rank, distance_sq, name_len)
+            if match < best.get(name_at, (1,)):
+                best[name_at] = match
+            found += 1
+            if found == limit:
+                cutoff = rank
+
+
+def build_index(places, path, cell_deg=CELL_DEG):
+    """
+    Write an index file from an iterable of (name, category, lat, lon, rank).
+    Rows with the same name and position are one place listed under several
+    categories. Returns the number of distinct places written.
+    """
+    categories = {}
+    cells = {}
+    names = bytearray()
+    name_spans = {}
+    for name, category, lat, lon, rank in places:
+        if not name or category is None or lat is None or lon is None:
+            continue
+        category_id = categories.setdefault(category, len(categories))
+        lat, lon = round(lat * 1e6), round(lon * 1e6)
+        name_span = name_spans.get((name, lat, lon))
+        if name_span is None:
+            encoded = name.encode("utf-8")[:0xFFFF]
+            name_span = name_spans[name, lat, lon] = (len(names), len(encoded))
+            names += encoded
+        cy, cx = _cell(lat / 1e6, lon / 1e6, cell_deg)
+        cells.setdefault(_cell_key(category_id, cy, cx), []).append(
+            (min(max(int(rank or 0), 0), 0xFFFF), lat, lon, category_id, name_span)
+        )
+
+    category_blob = json.dumps(sorted(categories, key=categories.get)).encode("utf-8")
+    keys = sorted(cells)
+
+    spans = bytearray()
+    records = bytearray()
+    count = 0
+    for key in keys:
+        places_in_cell = sorted(cells[key], key=lambda p: -p[0])
+        spans += SPAN.pack(count, len(places_in_cell))
+        for rank, lat, lon, category_id, (name_at, name_len) in places_in_cell:
+            records += RECORD.pack(lat, lon, category_id, rank, name_at, name_len)
+            count += 1
+
+    categories_at = HEADER.size
+    keys_at = categories_at + len(category_blob)
+    keys_at += -keys_at % 8
+    spans_at = keys_at + 8 * len(keys)
+    records_at = spans_at + len(spans)
+    names_at = records_at + len(records)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(
+            MAGIC, count, len(keys), len(categories), cell_deg,
+            categories_at, keys_at, spans_at, records_at, names_at,
+        ))
+        f.write(category_blob)
+        f.write(b" " * (keys_at - categories_at - len(category_blob)))
+        f.write(struct.pack(f"<{len(keys)}Q", *keys))
+        f.write(spans)
+        f.write(records)
+        f.write(names)
+    os.replace(tmp_path, path)
+    return len(name_spans)
+
+
+def get_index():
+    """The process-wide index, opened on first use; None when no index file exists"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                path = settings.POI_INDEX_PATH
+                _index = POIIndex(path) if path and os.path.exists(path) else _missing
+    return None if _index is _missing else _index
+
+
+def nearby(lat, lon, categories, radius_m, limit):
+    """Local index lookup, or None when the index is not installed"""
+    index = get_index()
+    if index is None:
+        return None
+    return index.nearby(lat, lon, categories, radius_m, limit)
@@ -0,0 +1,131 @@
+# itinerary/profiling.py
+"""
+On-demand sampling profiler for production requests.
+
+ProfilingMiddleware profiles a request when a staff user sends the
+PROFILE_HEADER header or the ?profile query flag, or at random with
+probability PROFILE_SAMPLE_RATE. A sampler thread reads the request thread's
+stack from sys._current_frames() every PROFILE_INTERVAL seconds while the
+view and its template rendering run, and the samples are written in folded
+format ("frame;frame;frame count" per line), ready for flamegraph.pl or
+speedscope. Frames are named module:function, so time in django.db,
+django.template, json or the HTTP client stands out directly.
+
+Files go to PROFILE_DIR, named after the time, view and trip id, and only
+the newest PROFILE_KEEP are kept. Only explicitly requested profiles name
+their file in an X-Profile response header; sampled responses, which may be
+public and cached, carry nothing. Requests that are not profiled only pay for
+a header and query-string check (plus a random() call when sampling is on).
+"""
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class Sampler(threading.Thread):
+    """Collects folded stacks of one thread until stop() is called"""
+
+    def __init__(self, thread_id, interval, root=None):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.root = root
+        self.stacks = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[fold(frame, self.root)] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        return self.stacks
+
+
+def fold(frame, root=None):
+    """Stack as module:function names, outermost first, cut at the `root` code object if present"""
+    names = []
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '?')
+        names.append(f"{module}:{frame.f_code.co_name}")
+        if frame.f_code is root:
+            break
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def write_profile(stacks, view_name, trip_id, elapsed_ms):
+    """Write folded stacks to PROFILE_DIR, pruning old files; returns the file name"""
+    directory = settings.PROFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+
+    stamp = timezone.now().strftime("%Y%m%dT%H%M%S%f")
+    tag = f"-trip{trip_id}" if trip_id is not None else ""
+    name = f"{stamp}-{view_name}{tag}-{elapsed_ms}ms.folded"
+    with open(os.path.join(directory, name), 'w', encoding='utf-8') as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+    profiles = sorted(entry for entry in os.listdir(directory) if entry.endswith('.folded'))
+    for old in profiles[:-settings.PROFILE_KEEP]:
+        try:
+            os.remove(os.path.join(directory, old))
+        except OSError:
+            pass
+    return name
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def requested(self, request):
+        """Whether a staff user asked for this request to be profiled"""
+        if settings.PROFILE_HEADER in request.headers or 'profile' in request.GET:
+            user = getattr(request, 'user', None)
+            return bool(user and user.is_staff)
+        return False
+
+    def __call__(self, request):
+        requested = self.requested(request)
+        if not requested and not (
+            settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE
+        ):
+            return self.get_response(request)
+
+        # Stacks start at this method, leaving out the server frames above it.
+        sampler = Sampler(threading.get_ident(), settings.PROFILE_INTERVAL, root=ProfilingMiddleware.__call__.__code__)
+        started = time.monotonic()
+        sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            stacks = sampler.stop()
+        elapsed_ms = int((time.monotonic() - started) * 1000)
+
+        view_name = getattr(request, '_profile_view', 'unresolved')
+        trip_id = getattr(request, '_profile_trip_id', None)
+        try:
+            name = write_profile(stacks, view_name, trip_id, elapsed_ms)
+        except OSError as e:
+            logger.warning("Could not write profile for %s: %s", view_name, e)
+        else:
+            if requested:
+                response['X-Profile'] = name
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._profile_view = getattr(view_func, '__name__', 'view')
+        request._profile_trip_id = view_kwargs.get('trip_id')
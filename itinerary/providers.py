@@ -0,0 +1,263 @@
+# itinerary/providers.py
+"""Weather, places and routing lookups shared by every trip-planning path."""
+import hashlib
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import poi, ratelimit
+
+# Straight-line route distances are measured from Bengaluru.
+ORIGIN_LON, ORIGIN_LAT = 77.5946, 12.9716
+
+
+def normalize_destination(destination):
+    """Canonical cache key form of a destination: "Goa , India" -> "goa, india" """
+    destination = re.sub(r"\s+", " ", (destination or "").strip().lower())
+    return re.sub(r"\s*,\s*", ", ", destination).strip(", ")
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls that share a key into one upstream call.
+
+    Threads in this process wait on an in-memory event. Other worker processes
+    see a lock in the shared cache and poll for the leader's result instead of
+    calling the provider themselves.
+    """
+
+    def __init__(self, prefix="singleflight"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def _keys(self, key):
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return f"{self.prefix}:result:{digest}", f"{self.prefix}:lock:{digest}"
+
+    def do(self, key, fn, timeout, refresh=False):
+        """
+        Return fn()'s result, sharing it with every concurrent caller of `key`.
+        With refresh=True a stored result is ignored and replaced.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {'event': threading.Event()}
+
+        if not leader:
+            call['event'].wait()
+            if 'error' in call:
+                raise call['error']
+            return call['result']
+
+        try:
+            call['result'] = self._do_shared(key, fn, timeout, refresh)
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call['event'].set()
+        return call['result']
+
+    def _do_shared(self, key, fn, timeout, refresh):
+        result_key, lock_key = self._keys(key)
+        if not refresh:
+            cached = cache.get(result_key)
+            if cached is not None:
+                return cached
+
+        lock_timeout = settings.PROVIDER_TIMEOUT * 2
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + lock_timeout
+        while not cache.add(lock_key, token, lock_timeout):
+            cached = cache.get(result_key)
+            if cached is not None:
+                return cached
+            if time.monotonic() > deadline:
+                break
+            time.sleep(0.05)
+
+        try:
+            result = fn()
+            if result is not None:
+                cache.set(result_key, result, timeout)
+            return result
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+
+class ProviderError(Exception):
+    """An upstream provider could not be reached."""
+
+
+_flight = SingleFlight("provider")
+_local = threading.local()
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def http_session():
+    """
+    Shared requests session, created on first use so that importing this
+    module (and booting a worker) does not pay for importing requests.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                _session = requests.Session()
+    return _session
+
+
+def upstream_call_count():
+    """Number of upstream provider requests made by the current thread"""
+    return getattr(_local, 'upstream_calls', 0)
+
+
+def _get_json(url, provider):
+    """
+    GET a provider URL; returns the decoded body, or None on a non-200 reply.
+    Raises ratelimit.RateLimited when the provider's global budget is spent.
+    """
+    import requests
+
+    ratelimit.limit(provider)
+    _local.upstream_calls = upstream_call_count() + 1
+    try:
+        response = http_session().get(url, timeout=settings.PROVIDER_TIMEOUT)
+    except requests.exceptions.RequestException as e:
+        raise ProviderError(str(e)) from e
+    if response.status_code == 200:
+        return response.json()
+    return None
+
+
+def current_weather(destination, refresh=False):
+    """OpenWeather current conditions for a destination, or None"""
+    key = normalize_destination(destination)
+    url = f"https://api.openweathermap.org/data/2.5/weather?q={destination}&appid={settings.OPENWEATHER_API_KEY}&units=metric"
+    return _flight.do(
+        f"weather:{key}", lambda: _get_json(url, 'openweather'),
+        settings.PROVIDER_CACHE_TIMEOUTS['weather'], refresh,
+    )
+
+
+def nearby_places(lat, lon, categories, limit, refresh=False):
+    """
+    Place names in `categories` within 5 km of lat/lon. The local POI index
+    answers first; Geoapify is only asked where the index is sparse.
+    """
+    local = poi.nearby(lat, lon, categories, 5000, limit)
+    if local is not None and len(local) >= min(limit, settings.POI_MIN_RESULTS):
+        return local
+
+    key = f"places:{categories}:{round(lat, 4)}:{round(lon, 4)}:{limit}"
+    url = f"https://api.geoapify.com/v2/places?categories={categories}&filter=circle:{lon},{lat},5000&limit={limit}&apiKey={settings.GEOAPIFY_API_KEY}"
+
+    def fetch():
+        data = _get_json(url, 'geoapify')
+        if data is None:
+            return None
+        return [
+            feature['properties'].get('name')
+            for feature in data.get('features', [])
+        ]
+
+    return _flight.do(key, fetch, settings.PROVIDER_CACHE_TIMEOUTS['places'], refresh)
+
+
+def route_distance_km(lat, lon, refresh=False):
+    """OSRM driving distance from the origin city, or None"""
+    key = f"route:{round(lat, 4)}:{round(lon, 4)}"
+    url = f"https://router.project-osrm.org/route/v1/driving/{ORIGIN_LON},{ORIGIN_LAT};{lon},{lat}?overview=false"
+
+    def fetch():
+        data = _get_json(url, 'osrm')
+        if data and data.get('routes'):
+            return round(data['routes'][0]['distance'] / 1000, 2)
+        return None
+
+    return _flight.do(key, fetch, settings.PROVIDER_CACHE_TIMEOUTS['route'], refresh)
+
+
+def daily_forecast(destination):
+    """
+    OpenWeather 5-day forecast for a destination folded into one entry per
+    date: {date: {'temp_min', 'temp_max', 'description'}}. None on failure.
+    """
+    url = f"https://api.openweathermap.org/data/2.5/forecast?q={destination}&appid={settings.OPENWEATHER_API_KEY}&units=metric"
+    data = _get_json(url, 'openweather')
+    if data is None:
+        return None
+
+    offset = timedelta(seconds=data.get('city', {}).get('timezone', 0))
+    days = {}
+    for item in data.get('list', []):
+        day = (datetime.fromtimestamp(item['dt'], tz=dt_timezone.utc) + offset).date()
+        entry = days.setdefault(day, {'temps': [], 'descriptions': Counter()})
+        entry['temps'].extend([item['main']['temp_min'], item['main']['temp_max']])
+        if item.get('weather'):
+            entry['descriptions'][item['weather'][0]['description']] += 1
+
+    return {
+        day: {
+            'temp_min': min(entry['temps']),
+            'temp_max': max(entry['temps']),
+            'description': entry['descriptions'].most_common(1)[0][0] if entry['descriptions'] else "",
+        }
+        for day, entry in days.items()
+    }
+
+
+def enrich_destination(destination, refresh=False):
+    """
+    Weather, attractions, hotels and distance for a destination as a dict of
+    Trip field values. Fields whose provider call failed are left out.
+    refresh=True bypasses and rewrites the cached provider results.
+    """
+    fields = {}
+
+    weather_data = current_weather(destination, refresh)
+    if weather_data is None:
+        fields['weather'] = "Weather data not available"
+        return fields
+
+    temp = weather_data['main']['temp']
+    desc = weather_data['weather'][0]['description']
+    fields['weather'] = f"{temp}°C, {desc}"
+
+    coord = weather_data.get('coord', {})
+    lat, lon = coord.get('lat'), coord.get('lon')
+    if not (lat and lon):
+        fields['attractions'] = "Location not found"
+        fields['hotels'] = "Location not found"
+        return fields
+
+    attractions = nearby_places(lat, lon, "tourism.sights,tourism.attraction", 10, refresh)
+    if attractions is not None:
+        attractions = [name for name in attractions[:5] if name]
+        fields['attractions'] = ", ".join(attractions) if attractions else "No attractions found"
+
+    hotels = nearby_places(lat, lon, "accommodation.hotel", 5, refresh)
+    if hotels is not None:
+        hotels = [name for name in hotels[:3] if name]
+        fields['hotels'] = ", ".join(hotels) if hotels else "No hotels found"
+
+    distance_km = route_distance_km(lat, lon, refresh)
+    if distance_km is not None:
+        fields['distance_km'] = distance_km
+
+    return fields
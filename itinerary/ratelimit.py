@@ -0,0 +1,98 @@
+# itinerary/ratelimit.py
+"""Token-bucket rate limits kept in the shared cache, configured by RATE_LIMITS."""
+import math
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+COUNTER_TIMEOUT = 7 * 24 * 60 * 60
+
+
+class RateLimited(Exception):
+    """Raised when a bucket is empty; retry_after is in whole seconds."""
+
+    def __init__(self, name, retry_after):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"{name} rate limit reached, retry in {retry_after}s")
+
+
+@contextmanager
+def _bucket_lock(key, wait=0.25):
+    """Serialize read-modify-write of one bucket across threads and workers"""
+    lock_key = f"{key}:lock"
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + wait
+    acquired = cache.add(lock_key, token, 5)
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(0.005)
+        acquired = cache.add(lock_key, token, 5)
+    try:
+        yield
+    finally:
+        if acquired and cache.get(lock_key) == token:
+            cache.delete(lock_key)
+
+
+def _count(name, decision):
+    key = f"ratelimit:count:{name}:{decision}"
+    cache.add(key, 0, COUNTER_TIMEOUT)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, COUNTER_TIMEOUT)
+
+
+def take(name, key="global", tokens=1):
+    """
+    Take tokens from bucket `name` for `key` (a user, session or "global").
+    Returns 0 when allowed, otherwise the seconds until enough tokens refill.
+    Unconfigured bucket names are never limited.
+    """
+    config = settings.RATE_LIMITS.get(name)
+    if not config:
+        return 0
+
+    capacity = config['capacity']
+    rate = capacity / config['per_seconds']
+    cache_key = f"ratelimit:{name}:{key}"
+
+    with _bucket_lock(cache_key):
+        now = time.time()
+        available, updated_at = cache.get(cache_key, (capacity, now))
+        available = min(capacity, available + (now - updated_at) * rate)
+        if available >= tokens:
+            available -= tokens
+            retry_after = 0
+        else:
+            retry_after = max(1, math.ceil((tokens - available) / rate))
+        cache.set(cache_key, (available, now), math.ceil(config['per_seconds'] * 2))
+
+    _count(name, 'allowed' if retry_after == 0 else 'denied')
+    return retry_after
+
+
+def limit(name, key="global", tokens=1):
+    """take(), raising RateLimited instead of returning a wait time"""
+    retry_after = take(name, key, tokens)
+    if retry_after:
+        raise RateLimited(name, retry_after)
+
+
+def counters():
+    """Allowed/denied decision counts per configured bucket"""
+    names = list(settings.RATE_LIMITS)
+    keys = {
+        f"ratelimit:count:{name}:{decision}": (name, decision)
+        for name in names
+        for decision in ('allowed', 'denied')
+    }
+    values = cache.get_many(list(keys))
+    result = {name: {'allowed': 0, 'denied': 0} for name in names}
+    for cache_key, value in values.items():
+        name, decision = keys[cache_key]
+        result[name][decision] = value
+    return result
@@ -0,0 +1,70 @@
+# itinerary/references.py
+"""
+Booking references and ticket IDs derived from the trip id.
+
+The id is passed through a Feistel permutation of its low 32 bits, keyed by
+BOOKING_REFERENCE_KEY (SECRET_KEY unless set) and the code prefix, so
+consecutive trips get unrelated codes that can't be worked out or
+enumerated from trip ids, while distinct ids can never share one. Codes are
+encoded in Crockford base32 (no I, L, O or U) to read out over the phone.
+
+Changing the key changes the codes of future trips only, and those may then
+collide with stored ones, so keep it fixed once trips have been booked.
+"""
+import hashlib
+
+from django.conf import settings
+
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+ROUNDS = 4
+WIDTH = 7  # 32 bits in base32
+
+BOOKING_PREFIX = "TRP"
+TICKET_PREFIX = "TKT"
+
+
+def _round(half, key, number):
+    digest = hashlib.blake2b(f"{number}:{half}".encode(), key=key, digest_size=2).digest()
+    return int.from_bytes(digest, "big")
+
+
+def _key(prefix):
+    return hashlib.sha256(f"{settings.BOOKING_REFERENCE_KEY}:{prefix}".encode()).digest()
+
+
+def _permute(value, key):
+    left, right = value >> 16, value & 0xFFFF
+    for number in range(ROUNDS):
+        left, right = right, left ^ _round(right, key, number)
+    return (left << 16) | right
+
+
+def _encode(value):
+    chars = []
+    while value:
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return "".join(reversed(chars)).rjust(WIDTH, "0")
+
+
+def make(prefix, trip_id):
+    """Code for trip_id; ids past 2**32 simply get longer codes"""
+    high, low = divmod(trip_id, 1 << 32)
+    return prefix + _encode((high << 32) | _permute(low, _key(prefix)))
+
+
+def booking_reference(trip_id):
+    return make(BOOKING_PREFIX, trip_id)
+
+
+def ticket_id(trip_id):
+    return make(TICKET_PREFIX, trip_id)
+
+
+def lookup_field(code):
+    """Trip field a (normalized, upper-case) code is stored in, judged by its prefix"""
+    if code.startswith(TICKET_PREFIX):
+        return 'ticket_id'
+    if code.startswith(BOOKING_PREFIX):
+        return 'booking_reference'
+    return None
@@ -0,0 +1,132 @@
+# itinerary/refinement.py
+"""
+Background AI itineraries for trips saved with a rule-based plan.
+
+Each worker process runs OPENROUTER_QUEUE_WORKERS generation threads. Once
+OPENROUTER_QUEUE_MAX_DEPTH jobs are waiting or running, new jobs are shed and
+those trips keep their rule-based plan. With OPENROUTER_QUEUE_WORKERS = 0 jobs
+run inline instead, which is what tests and single-threaded setups want.
+
+Queued and running jobs are counted per trip in the shared cache, so any
+worker can tell whether a trip's AI itinerary is still on its way.
+"""
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+from . import search, sharing
+from .models import Trip
+
+logger = logging.getLogger(__name__)
+
+PLAN_FIELDS = ('destination', 'start_date', 'end_date', 'budget', 'travelers', 'interests')
+
+# Upper bound on how long a job is reported as pending, should a worker die
+# before finishing it.
+PENDING_TIMEOUT = 15 * 60
+
+_pool = None
+_lock = threading.Lock()
+_depth = 0
+_counts = {'queued': 0, 'shed': 0, 'replaced': 0, 'failed': 0}
+
+
+def stats():
+    """This process's queue depth and job outcome counts"""
+    with _lock:
+        return dict(_counts, depth=_depth)
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=settings.OPENROUTER_QUEUE_WORKERS, thread_name_prefix="itinerary-ai"
+                )
+    return _pool
+
+
+def _count(outcome):
+    with _lock:
+        _counts[outcome] += 1
+
+
+def _pending_key(trip_id):
+    return f"refinement:pending:{trip_id}"
+
+
+def pending(trip_id):
+    """Whether an AI itinerary job for the trip is queued or running"""
+    return bool(cache.get(_pending_key(trip_id)))
+
+
+def _run(trip_id, plan, generate_itinerary):
+    global _depth
+    try:
+        try:
+            itinerary_data = generate_itinerary(
+                destination=plan['destination'],
+                days=(plan['end_date'] - plan['start_date']).days,
+                budget=plan['budget'],
+                travelers=plan['travelers'],
+                interests=plan['interests'],
+            )
+        except Exception as e:
+            itinerary_data = {"error": str(e)}
+
+        if 'itinerary' not in itinerary_data:
+            logger.warning("AI itinerary for trip %s failed: %s", trip_id, itinerary_data.get('error', 'unstructured reply'))
+            _count('failed')
+            return
+
+        # Only replace the quick plan the job was queued for; if the trip was
+        # edited or deleted meanwhile the result is stale and dropped. Booked
+        # trips keep the plan their tickets were sent with.
+        replaced = Trip.objects.filter(
+            pk=trip_id, itinerary_source=Trip.ITINERARY_RULES, is_booked=False, **plan
+        ).update(itinerary=json.dumps(itinerary_data), itinerary_source=Trip.ITINERARY_AI)
+        _count('replaced' if replaced else 'failed')
+        if replaced:
+            trip = Trip.objects.get(pk=trip_id)
+            if search.available():
+                search.index_trips([trip])
+            sharing.refresh_snapshots(trip)
+    finally:
+        with _lock:
+            _depth -= 1
+        try:
+            cache.decr(_pending_key(trip_id))
+        except ValueError:
+            pass
+        if settings.OPENROUTER_QUEUE_WORKERS:
+            connections.close_all()
+
+
+def submit(trip, generate_itinerary):
+    """
+    Queue an AI itinerary to replace `trip`'s rule-based plan. Returns False
+    when the queue is full and the job was shed.
+    """
+    global _depth
+    with _lock:
+        if _depth >= settings.OPENROUTER_QUEUE_MAX_DEPTH:
+            _counts['shed'] += 1
+            return False
+        _depth += 1
+        _counts['queued'] += 1
+
+    plan = {field: getattr(trip, field) for field in PLAN_FIELDS}
+    cache.add(_pending_key(trip.pk), 0, timeout=PENDING_TIMEOUT)
+    cache.incr(_pending_key(trip.pk))
+    if not settings.OPENROUTER_QUEUE_WORKERS:
+        _run(trip.pk, plan, generate_itinerary)
+        return True
+    _get_pool().submit(_run, trip.pk, plan, generate_itinerary)
+    return True
@@ -0,0 +1,160 @@
+# itinerary/replan.py
+"""Apply a trip edit while reusing as much of the existing plan as possible."""
+import json
+import re
+from datetime import timedelta
+
+from . import planner, providers
+from .models import Trip
+
+SNAPSHOT_FIELDS = (
+    'destination', 'start_date', 'end_date', 'budget', 'travelers', 'interests',
+    'itinerary', 'weather', 'hotels', 'attractions', 'distance_km',
+)
+
+
+def snapshot(trip):
+    """The trip parameters an edit is diffed against"""
+    return {field: getattr(trip, field) for field in SNAPSHOT_FIELDS}
+
+
+def interest_set(interests):
+    return {word.strip().lower() for word in re.split(r"[,;/]", interests or "") if word.strip()}
+
+
+def _day_text(day):
+    parts = []
+    for activity in day.get('activities', []):
+        parts.extend(str(activity.get(key, '')) for key in ('activity', 'location', 'type'))
+    return " ".join(parts).lower()
+
+
+def affected_days(days, old_interests, new_interests):
+    """
+    Day numbers to regenerate after an interests change: days built around a
+    removed interest, and for added interests the days that match none of
+    the interests the traveller kept (latest first, one per added interest).
+    """
+    old, new = interest_set(old_interests), interest_set(new_interests)
+    removed, added, kept = old - new, new - old, old & new
+
+    affected = {
+        day['day'] for day in days
+        if any(interest in _day_text(day) for interest in removed)
+    }
+    if added:
+        generic = [
+            day['day'] for day in reversed(days)
+            if day['day'] not in affected and not any(i in _day_text(day) for i in kept)
+        ]
+        fallback = [day['day'] for day in reversed(days) if day['day'] not in affected]
+        for number in (generic + fallback)[:len(added)]:
+            affected.add(number)
+    return affected
+
+
+def _load_days(itinerary):
+    try:
+        data = json.loads(itinerary)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get('itinerary'), list):
+        return None
+    return data
+
+
+def replan_trip(trip, old, generate_days):
+    """
+    Update `trip` (not saved) after an edit from the `old` snapshot.
+
+    - Destination details are only fetched again if the destination changed.
+    - A new destination, budget or traveller count replaces the itinerary
+      with a rule-based plan, for refinement.submit() to improve on.
+    - Otherwise existing days are kept and re-dated from the new start date,
+      extra days are dropped, and only added days and days affected by an
+      interests change are produced with generate_days(), falling back to
+      rule-based days if that fails. A trip still on its rule-based plan gets
+      rule-based days straight away: the AI itinerary queued after the edit
+      replaces the whole plan anyway.
+
+    Returns a list of human-readable actions taken.
+    """
+    actions = []
+    same_destination = (
+        providers.normalize_destination(old['destination'])
+        == providers.normalize_destination(trip.destination)
+    )
+    if same_destination:
+        for field in ('weather', 'hotels', 'attractions', 'distance_km'):
+            setattr(trip, field, old[field])
+    else:
+        for field, value in providers.enrich_destination(trip.destination).items():
+            setattr(trip, field, value)
+        actions.append("refreshed destination details")
+
+    data = _load_days(old['itinerary'])
+    if (not same_destination or data is None
+            or old['budget'] != trip.budget or old['travelers'] != trip.travelers):
+        trip.itinerary = json.dumps(planner.build_for_trip(trip))
+        trip.itinerary_source = Trip.ITINERARY_RULES
+        actions.append("made a new itinerary")
+        return actions
+
+    days = sorted(
+        (day for day in data['itinerary'] if isinstance(day, dict)),
+        key=lambda day: day.get('day', 0),
+    )
+    for number, day in enumerate(days, start=1):
+        day['day'] = number
+
+    total = trip.duration_days
+    if total < len(days):
+        actions.append(f"removed {len(days) - total} day(s)")
+        days = days[:total]
+
+    regenerate = set(range(len(days) + 1, total + 1))
+    if regenerate:
+        actions.append(f"added {len(regenerate)} day(s)")
+    if interest_set(old['interests']) != interest_set(trip.interests):
+        changed = affected_days(days, old['interests'], trip.interests) - regenerate
+        if changed:
+            actions.append(f"re-planned {len(changed)} day(s) for the new interests")
+        regenerate |= changed
+
+    shift = (trip.start_date - old['start_date']).days
+    if shift:
+        actions.append(f"moved every day by {shift:+d} day(s)")
+
+    def date_of(number):
+        return (trip.start_date + timedelta(days=number - 1)).isoformat()
+
+    by_number = {day['day']: day for day in days}
+    if regenerate:
+        use_ai = trip.itinerary_source != Trip.ITINERARY_RULES
+        result = {}
+        if use_ai:
+            result = generate_days(
+                trip,
+                [(number, date_of(number)) for number in sorted(regenerate)],
+                [day for day in days if day['day'] not in regenerate],
+            )
+        generated = set()
+        for day in result.get('itinerary', []):
+            if isinstance(day, dict) and day.get('day') in regenerate:
+                by_number[day['day']] = day
+                generated.add(day['day'])
+        # Days the AI didn't return, including existing days picked for
+        # regeneration, are replaced with rule-based ones.
+        missing = regenerate - generated
+        if missing:
+            for day in planner.build_for_trip(trip)['itinerary']:
+                if day['day'] in missing:
+                    by_number[day['day']] = day
+            if use_ai:
+                actions.append(f"used quick plans for {len(missing)} day(s) the AI planner could not generate")
+
+    for number, day in by_number.items():
+        day['date'] = date_of(number)
+    data['itinerary'] = [by_number[number] for number in sorted(by_number)]
+    trip.itinerary = json.dumps(data)
+    return actions
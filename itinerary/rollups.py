@@ -0,0 +1,201 @@
+# itinerary/rollups.py
+"""
+Incremental trip analytics.
+
+Every Trip remembers the raw values of its rollup fields when it is loaded.
+On save and delete the difference between that snapshot and the new state is
+applied to DestinationStats / DailyDestinationStats / DestinationUserStats
+with F() updates, so the admin and autocomplete never have to scan the Trip
+table. Trips loaded with any of those fields
+deferred have no snapshot; saving or deleting one reads the old values from
+the database first.
+
+Archived trips stay counted: archival runs inside suspended(), and a trip
+only leaves the rollups when its ArchivedTrip row is deleted.
+"""
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import ArchivedTrip, DailyDestinationStats, DestinationStats, DestinationUserStats, Trip
+from .providers import normalize_destination
+
+RollupState = namedtuple('RollupState', 'destination name day budget booked user')
+
+# Trip fields trip_state() reads, in the order snapshots store them.
+ROLLUP_FIELDS = ('destination', 'created_at', 'budget', 'is_booked', 'user_id')
+
+_local = threading.local()
+
+
+@contextmanager
+def suspended():
+    """Ignore Trip saves and deletes made by this thread inside the block"""
+    _local.suspended = True
+    try:
+        yield
+    finally:
+        _local.suspended = False
+
+
+def _state(destination, created_at, budget, is_booked, user_id):
+    if created_at is None:
+        return None
+    return RollupState(
+        destination=normalize_destination(destination),
+        name=destination,
+        day=timezone.localdate(created_at),
+        budget=budget,
+        booked=bool(is_booked),
+        user=user_id,
+    )
+
+
+def trip_state(trip):
+    if trip.pk is None:
+        return None
+    return _state(*(getattr(trip, field) for field in ROLLUP_FIELDS))
+
+
+def _loaded_values(trip):
+    """Raw rollup field values, or None if any is deferred (reading it would query)"""
+    values = trip.__dict__
+    if all(field in values for field in ROLLUP_FIELDS):
+        return tuple(values[field] for field in ROLLUP_FIELDS)
+    return None
+
+
+def _old_state(trip):
+    if trip._rollup_values is None:
+        return None
+    return _state(*trip._rollup_values)
+
+
+def _touches_rollups(update_fields):
+    return not update_fields or not {'user', *ROLLUP_FIELDS}.isdisjoint(update_fields)
+
+
+def apply_changes(changes):
+    """Apply (state, sign) pairs, where sign is +1 to add a trip and -1 to remove it"""
+    totals = {}
+    daily = {}
+    per_user = {}
+    for state, sign in changes:
+        if state is None:
+            continue
+        entry = totals.setdefault(state.destination, {
+            'name': state.name, 'trips': 0, 'booked_trips': 0, 'budget_total': 0, 'budget_trips': 0, 'users': 0,
+        })
+        entry['trips'] += sign
+        entry['booked_trips'] += sign * state.booked
+        if state.budget is not None:
+            entry['budget_total'] += sign * state.budget
+            entry['budget_trips'] += sign
+
+        day_entry = daily.setdefault((state.destination, state.day), {'trips': 0, 'booked_trips': 0})
+        day_entry['trips'] += sign
+        day_entry['booked_trips'] += sign * state.booked
+
+        user_key = (state.destination, state.user)
+        per_user[user_key] = per_user.get(user_key, 0) + sign
+
+    with transaction.atomic():
+        stats_ids = {}
+        for destination, entry in totals.items():
+            stats, _ = DestinationStats.objects.get_or_create(
+                destination=destination, defaults={'name': entry['name']}
+            )
+            stats_ids[destination] = stats.pk
+
+        # A user joins or leaves a destination's `users` count when their
+        # trip count there moves off or back to zero.
+        for (destination, user_id), delta in per_user.items():
+            if not delta:
+                continue
+            row, _ = DestinationUserStats.objects.select_for_update().get_or_create(
+                destination_id=stats_ids[destination], user_id=user_id
+            )
+            after = row.trips + delta
+            totals[destination]['users'] += (after > 0) - (row.trips > 0)
+            if after > 0:
+                DestinationUserStats.objects.filter(pk=row.pk).update(trips=after)
+            else:
+                row.delete()
+
+        for destination, entry in totals.items():
+            deltas = {
+                field: F(field) + entry[field]
+                for field in ('trips', 'booked_trips', 'budget_total', 'budget_trips', 'users')
+                if entry[field]
+            }
+            if deltas:
+                DestinationStats.objects.filter(pk=stats_ids[destination]).update(**deltas)
+
+        for (destination, day), entry in daily.items():
+            deltas = {field: F(field) + value for field, value in entry.items() if value}
+            if not deltas:
+                continue
+            row, _ = DailyDestinationStats.objects.get_or_create(
+                destination_id=stats_ids[destination], day=day
+            )
+            DailyDestinationStats.objects.filter(pk=row.pk).update(**deltas)
+
+
+def record_created(trips):
+    """Count trips inserted without save signals, e.g. through bulk_create"""
+    apply_changes([(trip_state(trip), 1) for trip in trips])
+    for trip in trips:
+        trip._rollup_values = _loaded_values(trip)
+
+
+@receiver(post_init, sender=Trip)
+def remember_trip_state(sender, instance, **kwargs):
+    # Runs for every loaded Trip, so it only copies values; trip_state() is
+    # worked out when a save or delete needs it.
+    instance._rollup_values = _loaded_values(instance)
+
+
+def _fetch_missing_snapshot(instance):
+    if instance._rollup_values is None and instance.pk is not None and not instance._state.adding:
+        instance._rollup_values = Trip.objects.filter(pk=instance.pk).values_list(*ROLLUP_FIELDS).first()
+
+
+@receiver(pre_save, sender=Trip)
+def fetch_rollup_state_before_save(sender, instance, update_fields=None, **kwargs):
+    if _touches_rollups(update_fields) and not getattr(_local, 'suspended', False):
+        _fetch_missing_snapshot(instance)
+
+
+@receiver(post_save, sender=Trip)
+def update_rollups_on_save(sender, instance, created, update_fields=None, **kwargs):
+    if not _touches_rollups(update_fields):
+        return
+    if not getattr(_local, 'suspended', False):
+        old = None if created else _old_state(instance)
+        new = trip_state(instance)
+        if old != new:
+            apply_changes([(old, -1), (new, 1)])
+    instance._rollup_values = _loaded_values(instance)
+
+
+@receiver(pre_delete, sender=Trip)
+def fetch_rollup_state_before_delete(sender, instance, **kwargs):
+    if not getattr(_local, 'suspended', False):
+        _fetch_missing_snapshot(instance)
+
+
+@receiver(post_delete, sender=Trip)
+def update_rollups_on_delete(sender, instance, **kwargs):
+    if not getattr(_local, 'suspended', False):
+        apply_changes([(_old_state(instance), -1)])
+
+
+@receiver(post_delete, sender=ArchivedTrip)
+def update_rollups_on_archive_delete(sender, instance, **kwargs):
+    apply_changes([(trip_state(instance), -1)])
@@ -0,0 +1,192 @@
+# itinerary/search.py
+"""
+Full-text search over a user's trips with SQLite FTS5.
+
+itinerary_trip_fts holds one row per Trip (rowid = trip id) with the
+destination, interests, attractions, hotels and every itinerary activity
+and location, so searching never has to parse Trip.itinerary. The owner is
+an indexed token ("u42") matched in the same query, so the index narrows a
+search to one user's trips instead of matching everyone's and filtering. Save and
+delete signals keep it current; code that writes trips without signals
+(bulk_create, bulk_update, QuerySet.update) calls index_trips() itself.
+`manage.py rebuild_search_index` repopulates it from scratch.
+
+On other databases, or SQLite builds without FTS5, search() falls back to
+plain substring matching without ranking.
+"""
+import json
+import re
+from collections import namedtuple
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Trip
+
+TABLE = 'itinerary_trip_fts'
+COLUMNS = ('destination', 'interests', 'attractions', 'hotels', 'activities')
+# Trip fields document() reads; saves touching none of them skip reindexing.
+INDEXED_FIELDS = {'user', 'destination', 'interests', 'attractions', 'hotels', 'itinerary'}
+# bm25() weights, in table column order (owner first, which doesn't rank).
+WEIGHTS = (0.0, 10.0, 4.0, 2.0, 1.0, 3.0)
+
+# Snippet highlight markers, swapped for <mark> after the text is escaped.
+OPEN, CLOSE = "\x02", "\x03"
+
+INSERT_SQL = (
+    f"INSERT INTO {TABLE} (rowid, owner, {', '.join(COLUMNS)}) "
+    f"VALUES ({', '.join(['%s'] * (len(COLUMNS) + 2))})"
+)
+
+SearchHit = namedtuple('SearchHit', 'trip snippet')
+
+_available = None
+
+
+def create_table_sql():
+    columns = ", ".join(COLUMNS)
+    return f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(owner, {columns}, tokenize='porter unicode61')"
+
+
+def owner_token(user_id):
+    return f"u{user_id}"
+
+
+def available():
+    """Whether the FTS table exists on this database"""
+    global _available
+    if _available is None:
+        _available = connection.vendor == 'sqlite' and TABLE in connection.introspection.table_names()
+    return _available
+
+
+def document(trip):
+    """Searchable column values for a trip (a Trip or a historical model instance)"""
+    activities = []
+    try:
+        data = json.loads(trip.itinerary or "")
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        days = data.get('itinerary')
+        for day in days if isinstance(days, list) else []:
+            for activity in (day.get('activities') or []) if isinstance(day, dict) else []:
+                if isinstance(activity, dict):
+                    activities.append(f"{activity.get('activity', '')} — {activity.get('location', '')}")
+        if data.get('raw_itinerary'):
+            activities.append(str(data['raw_itinerary']))
+
+    return (
+        trip.destination or "",
+        trip.interests or "",
+        trip.attractions or "",
+        trip.hotels or "",
+        "\n".join(activities),
+    )
+
+
+def index_trips(trips):
+    """Add or refresh the index rows for `trips`"""
+    trips = [trip for trip in trips if trip.pk is not None]
+    if not trips:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {TABLE} WHERE rowid = %s", [(trip.pk,) for trip in trips])
+        cursor.executemany(INSERT_SQL, [(trip.pk, owner_token(trip.user_id), *document(trip)) for trip in trips])
+
+
+def remove(trip_ids):
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {TABLE} WHERE rowid = %s", [(pk,) for pk in trip_ids])
+
+
+def rebuild(batch_size=500):
+    """Reindex every trip; returns how many were indexed"""
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+    batch = []
+    count = 0
+    for trip in Trip.objects.iterator(chunk_size=batch_size):
+        batch.append(trip)
+        if len(batch) >= batch_size:
+            index_trips(batch)
+            count += len(batch)
+            batch = []
+    index_trips(batch)
+    return count + len(batch)
+
+
+def match_expression(query):
+    """
+    FTS5 query for free text: every word must match, the last one as a
+    prefix so results appear while typing. Words are quoted, so FTS5 syntax
+    in the input is treated as plain text.
+    """
+    words = re.findall(r"\w+", query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _highlight(snippet):
+    return mark_safe(escape(snippet).replace(OPEN, "<mark>").replace(CLOSE, "</mark>"))
+
+
+def search(user, query, limit=20):
+    """The user's trips matching `query`, best first, as SearchHit(trip, snippet)"""
+    expression = match_expression(query)
+    if expression is None:
+        return []
+
+    if not available():
+        text = " ".join(re.findall(r"\w+", query))
+        trips = Trip.objects.filter(user=user).filter(
+            Q(destination__icontains=text) | Q(interests__icontains=text)
+            | Q(attractions__icontains=text) | Q(hotels__icontains=text)
+            | Q(itinerary__icontains=text)
+        ).order_by('-created_at')[:limit]
+        return [SearchHit(trip, "") for trip in trips]
+
+    weights = ", ".join(str(weight) for weight in WEIGHTS)
+    # The owner token narrows the match to the user's rows; the words only
+    # match the content columns.
+    expression = f"owner:{owner_token(user.pk)} AND {{{' '.join(COLUMNS)}}} : ({expression})"
+    # snippet(-1) would pick the owner column, which always matches, so take
+    # one per content column and keep the most highlighted.
+    snippets = ", ".join(
+        f"snippet({TABLE}, {column}, %s, %s, '…', 12)" for column in range(1, len(COLUMNS) + 1)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, {snippets} FROM {TABLE} "
+            f"WHERE {TABLE} MATCH %s ORDER BY bm25({TABLE}, {weights}) LIMIT %s",
+            [OPEN, CLOSE] * len(COLUMNS) + [expression, limit],
+        )
+        rows = cursor.fetchall()
+
+    trips = Trip.objects.in_bulk([row[0] for row in rows])
+    return [
+        SearchHit(trips[trip_id], _highlight(max(snippets, key=lambda snippet: snippet.count(OPEN))))
+        for trip_id, *snippets in rows
+        if trip_id in trips
+    ]
+
+
+@receiver(post_save, sender=Trip)
+def index_trip_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if update_fields and not INDEXED_FIELDS & set(update_fields):
+        return
+    if available() and not raw:
+        index_trips([instance])
+
+
+@receiver(post_delete, sender=Trip)
+def remove_trip_on_delete(sender, instance, **kwargs):
+    if available():
+        remove([instance.pk])
@@ -0,0 +1,84 @@
+# itinerary/sharing.py
+"""
+Public share links for trips.
+
+Each active TripShare stores the rendered shared_trip.html page and its
+ETag. Trip saves re-render it (once per trip, for all its links) only when
+the page would actually change, so serving a link is one primary-key lookup
+and often just a 304. Code that writes trips without save signals calls
+refresh_snapshots() itself.
+"""
+import hashlib
+import json
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import Trip, TripShare
+
+# Trip fields the shared page shows; saves touching none of them are ignored.
+SHARED_FIELDS = {
+    'destination', 'start_date', 'end_date', 'travelers', 'interests',
+    'weather', 'hotels', 'attractions', 'itinerary', 'distance_km',
+}
+
+
+def public_itinerary(itinerary):
+    """
+    The parts of a stored itinerary the public page may show. Costs are left
+    out because they are derived from the budget, and so is unstructured AI
+    text, which may quote it.
+    """
+    try:
+        data = json.loads(itinerary or "")
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get('itinerary'), list):
+        return None
+
+    days = []
+    for day in data['itinerary']:
+        if not isinstance(day, dict):
+            continue
+        activities = [
+            {key: activity.get(key) for key in ('time', 'activity', 'location', 'type', 'duration')}
+            for activity in day.get('activities') or []
+            if isinstance(activity, dict)
+        ]
+        days.append({'day': day.get('day'), 'date': day.get('date'), 'activities': activities})
+
+    summary = data.get('summary') if isinstance(data.get('summary'), dict) else {}
+    return {
+        'itinerary': days,
+        'summary': {key: summary.get(key) for key in ('best_transportation', 'must_see', 'tips')},
+    }
+
+
+def render_snapshot(trip):
+    """(html, etag) of the public page for `trip`"""
+    itinerary = public_itinerary(trip.itinerary)
+    html = render_to_string('shared_trip.html', {'trip': trip, 'itinerary': itinerary})
+    return html, hashlib.sha256(html.encode()).hexdigest()[:32]
+
+
+def create_share(trip):
+    html, etag = render_snapshot(trip)
+    return TripShare.objects.create(trip=trip, html=html, etag=etag, rendered_at=timezone.now())
+
+
+def refresh_snapshots(trip):
+    """Re-render the trip's active links if the page changed; returns how many were updated"""
+    shares = TripShare.objects.filter(trip=trip, revoked_at__isnull=True)
+    if not shares.exists():
+        return 0
+    html, etag = render_snapshot(trip)
+    return shares.exclude(etag=etag).update(html=html, etag=etag, rendered_at=timezone.now())
+
+
+@receiver(post_save, sender=Trip)
+def refresh_snapshots_on_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if created or raw or (update_fields and not SHARED_FIELDS & set(update_fields)):
+        return
+    refresh_snapshots(instance)
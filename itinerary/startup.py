@@ -0,0 +1,27 @@
+# itinerary/startup.py
+"""Work done once per worker at boot so the first request does not pay for it."""
+from pathlib import Path
+
+from django.template import TemplateDoesNotExist, TemplateSyntaxError
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+TEMPLATE_DIR = Path(__file__).resolve().parent / 'templates'
+
+
+def warm_templates():
+    """Compile every app template into the cached template loader"""
+    warmed = 0
+    for path in sorted(TEMPLATE_DIR.rglob('*.html')):
+        try:
+            get_template(path.relative_to(TEMPLATE_DIR).as_posix())
+        except (TemplateDoesNotExist, TemplateSyntaxError):
+            continue
+        warmed += 1
+    return warmed
+
+
+def warm():
+    """Import the URLconf (and with it the views) and compile templates"""
+    get_resolver().url_patterns
+    return warm_templates()
@@ -1,3 +1,713 @@
-from django.test import TestCase
+import io
+import json
+import threading
+import time
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from . import autocomplete, importer, llm, notifications, providers, ratelimit, references, replan, search, sharing
+from .models import (
+    ArchivedTrip, DailyDestinationStats, DestinationStats, DestinationUserStats, NotificationLog, Trip, TripShare,
+)
+
+
+def _activity(name, location):
+    return {"time": "09:00 AM", "activity": name, "location": location, "type": "sightseeing"}
+
+
+def _day(number, name, location):
+    return {"day": number, "date": "", "activities": [_activity(name, location)], "total_cost": "₹1,000"}
+
+
+class ReplanTests(SimpleTestCase):
+    def setUp(self):
+        self.trip = Trip(
+            user=User(username="traveller"),
+            destination="Goa",
+            start_date=date(2026, 11, 1),
+            end_date=date(2026, 11, 4),
+            budget=30000,
+            travelers=2,
+            interests="beach, nightlife",
+            attractions="Fort Aguada, Baga Beach",
+            itinerary=json.dumps({"itinerary": [
+                _day(1, "Beach morning", "Baga Beach"),
+                _day(2, "Nightlife at Tito's", "Tito's Lane"),
+                _day(3, "Fort walk", "Fort Aguada"),
+            ], "summary": {}}),
+            itinerary_source=Trip.ITINERARY_AI,
+        )
+        self.old = replan.snapshot(self.trip)
+        self.calls = []
+
+    def generate(self, result):
+        def generate_days(trip, days, kept_days):
+            self.calls.append((days, [day["day"] for day in kept_days]))
+            return result
+        return generate_days
+
+    def days(self):
+        return json.loads(self.trip.itinerary)["itinerary"]
+
+    def test_affected_days_for_removed_and_added_interests(self):
+        days = json.loads(self.trip.itinerary)["itinerary"]
+        self.assertEqual(replan.affected_days(days, "beach, nightlife", "beach"), {2})
+        # An added interest takes the latest day that matches no kept interest.
+        self.assertEqual(replan.affected_days(days, "beach", "beach, food"), {3})
+        self.assertEqual(replan.affected_days(days, "beach", "Beach"), set())
+
+    def test_interest_change_regenerates_only_affected_days(self):
+        self.trip.interests = "beach"
+        new_day = _day(2, "Spice plantation tour", "Ponda")
+        actions = replan.replan_trip(self.trip, self.old, self.generate({"itinerary": [new_day]}))
+
+        self.assertEqual(self.calls, [([(2, "2026-11-02")], [1, 3])])
+        self.assertEqual(
+            [day["activities"][0]["activity"] for day in self.days()],
+            ["Beach morning", "Spice plantation tour", "Fort walk"],
+        )
+        self.assertIn("re-planned 1 day(s) for the new interests", actions)
+
+    def test_failed_generation_falls_back_to_rule_based_days(self):
+        self.trip.interests = "beach"
+        actions = replan.replan_trip(self.trip, self.old, self.generate({"error": "AI unavailable"}))
+
+        days = self.days()
+        self.assertEqual([day["day"] for day in days], [1, 2, 3])
+        self.assertNotIn("Tito", json.dumps(days))
+        self.assertEqual(days[0]["activities"][0]["activity"], "Beach morning")
+        self.assertEqual(days[2]["activities"][0]["activity"], "Fort walk")
+        self.assertIn("used quick plans for 1 day(s) the AI planner could not generate", actions)
+
+    def test_quick_plan_days_are_rebuilt_without_the_ai(self):
+        self.trip.itinerary_source = Trip.ITINERARY_RULES
+        self.trip.interests = "beach"
+        self.trip.end_date = date(2026, 11, 5)
+        actions = replan.replan_trip(self.trip, self.old, self.generate({"error": "not called"}))
+
+        self.assertEqual(self.calls, [])
+        days = self.days()
+        self.assertEqual([day["day"] for day in days], [1, 2, 3, 4])
+        self.assertNotIn("Tito", json.dumps(days))
+        self.assertEqual(days[0]["activities"][0]["activity"], "Beach morning")
+        self.assertEqual(actions, ["added 1 day(s)", "re-planned 1 day(s) for the new interests"])
+
+    def test_moving_dates_only_relabels_days(self):
+        self.trip.start_date = date(2026, 12, 1)
+        self.trip.end_date = date(2026, 12, 4)
+        actions = replan.replan_trip(self.trip, self.old, self.generate({"error": "not called"}))
+
+        self.assertEqual(self.calls, [])
+        self.assertEqual([day["date"] for day in self.days()], ["2026-12-01", "2026-12-02", "2026-12-03"])
+        self.assertEqual(actions, ["moved every day by +30 day(s)"])
+
+    def test_longer_trip_generates_only_new_days(self):
+        self.trip.end_date = date(2026, 11, 6)
+        replan.replan_trip(self.trip, self.old, self.generate({"itinerary": [
+            _day(4, "Dudhsagar Falls", "Mollem"), _day(5, "Old Goa churches", "Old Goa"),
+        ]}))
+
+        self.assertEqual(self.calls, [([(4, "2026-11-04"), (5, "2026-11-05")], [1, 2, 3])])
+        self.assertEqual(len(self.days()), 5)
+
+    def test_shorter_trip_drops_last_days(self):
+        self.trip.end_date = date(2026, 11, 3)
+        actions = replan.replan_trip(self.trip, self.old, self.generate({"error": "not called"}))
+
+        self.assertEqual(self.calls, [])
+        self.assertEqual([day["day"] for day in self.days()], [1, 2])
+        self.assertEqual(actions, ["removed 1 day(s)"])
+
+    def test_budget_change_makes_a_new_rule_based_plan(self):
+        self.trip.budget = 60000
+        actions = replan.replan_trip(self.trip, self.old, self.generate({"error": "not called"}))
+
+        self.assertEqual(self.calls, [])
+        self.assertEqual(self.trip.itinerary_source, Trip.ITINERARY_RULES)
+        self.assertEqual(len(self.days()), 3)
+        self.assertEqual(actions, ["made a new itinerary"])
+
+
+@override_settings(RATE_LIMITS={'test': {'capacity': 3, 'per_seconds': 60}})
+class RateLimitTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = 1_000_000.0
+        clock = mock.Mock(wraps=time)
+        clock.time = lambda: self.now
+        patcher = mock.patch.object(ratelimit, 'time', clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_capacity_then_wait_for_one_token(self):
+        self.assertEqual([ratelimit.take('test', 'a') for _ in range(3)], [0, 0, 0])
+        # One token refills every 20 seconds.
+        self.assertEqual(ratelimit.take('test', 'a'), 20)
+        self.now += 19.5
+        self.assertEqual(ratelimit.take('test', 'a'), 1)
+        self.now += 0.5
+        self.assertEqual(ratelimit.take('test', 'a'), 0)
+
+    def test_refill_stops_at_capacity(self):
+        for _ in range(3):
+            ratelimit.take('test', 'a')
+        self.now += 3600
+        self.assertEqual([ratelimit.take('test', 'a') for _ in range(4)], [0, 0, 0, 20])
+
+    def test_denied_takes_do_not_use_tokens(self):
+        for _ in range(3):
+            ratelimit.take('test', 'a')
+        for _ in range(5):
+            ratelimit.take('test', 'a')
+        self.now += 20
+        self.assertEqual(ratelimit.take('test', 'a'), 0)
+
+    def test_keys_and_unconfigured_buckets_are_independent(self):
+        for _ in range(3):
+            ratelimit.take('test', 'a')
+        self.assertEqual(ratelimit.take('test', 'b'), 0)
+        self.assertEqual(ratelimit.take('unconfigured', 'a'), 0)
+        with self.assertRaises(ratelimit.RateLimited) as raised:
+            ratelimit.limit('test', 'a', tokens=2)
+        self.assertEqual(raised.exception.retry_after, 40)
+
+
+class ReferenceTests(SimpleTestCase):
+    def test_codes_are_unique_and_fixed_width(self):
+        ids = list(range(1, 100_001)) + [2 ** 32 - 2, 2 ** 32 - 1]
+        codes = [references.booking_reference(trip_id) for trip_id in ids]
+        self.assertEqual(len(set(codes)), len(ids))
+        self.assertEqual({len(code) for code in codes}, {len(references.BOOKING_PREFIX) + references.WIDTH})
+
+    def test_codes_use_the_crockford_alphabet(self):
+        for trip_id in range(1, 1000):
+            code = references.ticket_id(trip_id)[len(references.TICKET_PREFIX):]
+            self.assertFalse(set(code) & set("ILOU"), code)
+
+    def test_codes_are_stable_and_differ_by_prefix(self):
+        self.assertEqual(references.booking_reference(42), references.booking_reference(42))
+        self.assertNotEqual(
+            references.booking_reference(42)[len(references.BOOKING_PREFIX):],
+            references.ticket_id(42)[len(references.TICKET_PREFIX):],
+        )
+
+    def test_codes_depend_on_the_secret_key(self):
+        with override_settings(BOOKING_REFERENCE_KEY="one"):
+            first = [references.booking_reference(trip_id) for trip_id in range(1, 50)]
+        with override_settings(BOOKING_REFERENCE_KEY="two"):
+            second = [references.booking_reference(trip_id) for trip_id in range(1, 50)]
+        self.assertFalse(set(first) & set(second))
+
+    def test_ids_past_32_bits_do_not_collide(self):
+        low, high = references.booking_reference(5), references.booking_reference(5 + 2 ** 32)
+        self.assertNotEqual(low, high)
+
+    def test_lookup_field_by_prefix(self):
+        self.assertEqual(references.lookup_field(references.ticket_id(7)), 'ticket_id')
+        self.assertEqual(references.lookup_field(references.booking_reference(7)), 'booking_reference')
+        self.assertIsNone(references.lookup_field("ABC123"))
+
+
+class MatchExpressionTests(SimpleTestCase):
+    def test_words_are_quoted_and_the_last_is_a_prefix(self):
+        self.assertEqual(search.match_expression("goa beach"), '"goa" "beach"*')
+
+    def test_fts_syntax_is_treated_as_text(self):
+        self.assertEqual(search.match_expression('goa OR "x" NEAR(a b) col:val*'), '"goa" "OR" "x" "NEAR" "a" "b" "col" "val"*')
+        self.assertEqual(search.match_expression("-beach ^fort"), '"beach" "fort"*')
+
+    def test_no_words(self):
+        self.assertIsNone(search.match_expression(""))
+        self.assertIsNone(search.match_expression(' "*()- '))
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        search._available = None
+        self.user = User.objects.create(username="traveller", email="traveller@example.com")
+        other = User.objects.create(username="other", email="other@example.com")
+        dates = {'start_date': date(2026, 11, 1), 'end_date': date(2026, 11, 3), 'budget': 10000, 'travelers': 1}
+        self.goa = Trip.objects.create(user=self.user, destination="Goa", interests="beaches", **dates)
+        self.jaipur = Trip.objects.create(
+            user=self.user, destination="Jaipur", interests="forts",
+            itinerary=json.dumps({"itinerary": [_day(1, "Sunset at the beach cafe", "Jal Mahal")]}), **dates
+        )
+        Trip.objects.create(user=other, destination="Goa", interests="beaches", **dates)
+
+    def test_only_the_users_trips_best_match_first(self):
+        hits = search.search(self.user, "beach")
+        self.assertEqual([hit.trip for hit in hits], [self.goa, self.jaipur])
+
+    def test_prefix_and_snippet_escaping(self):
+        self.jaipur.itinerary = json.dumps({"itinerary": [_day(1, "<b>Amber</b> fort", "Amer")]})
+        self.jaipur.save()
+        [hit] = search.search(self.user, "amb")
+        self.assertEqual(hit.trip, self.jaipur)
+        self.assertIn("&lt;b&gt;<mark>Amber</mark>", hit.snippet)
+
+    def test_owner_tokens_are_not_searchable_text(self):
+        other = Trip.objects.exclude(user=self.user).get()
+        self.assertEqual(search.search(self.user, search.owner_token(self.user.pk)), [])
+        self.assertEqual(search.search(self.user, search.owner_token(other.user_id)), [])
+
+    def test_fts_operators_do_not_raise(self):
+        self.assertEqual(search.search(self.user, 'goa" OR NEAR(*'), [])
+
+
+class ShareTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="traveller", email="traveller@example.com")
+        self.trip = Trip.objects.create(
+            user=self.user, destination="Goa", start_date=date(2020, 11, 1), end_date=date(2020, 11, 3),
+            budget=10000, travelers=1, itinerary=json.dumps({"itinerary": [_day(1, "Fort walk", "Fort Aguada")]}),
+        )
+        self.share = sharing.create_share(self.trip)
+        self.url = reverse('shared_trip', args=[self.share.token])
+
+    def test_links_keep_serving_the_snapshot_after_archiving(self):
+        page = self.client.get(self.url)
+        call_command('archive_trips', stdout=io.StringIO())
+
+        self.assertFalse(Trip.objects.exists())
+        share = TripShare.objects.get()
+        self.assertEqual((share.trip_id, share.archived_trip_id), (None, self.trip.id))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, page.content)
+        self.assertContains(response, "Fort walk")
+
+    def test_archived_links_are_listed_and_can_be_revoked(self):
+        call_command('archive_trips', stdout=io.StringIO())
+        self.client.force_login(self.user)
+
+        detail = self.client.get(reverse('trip_detail', args=[self.trip.id]))
+        self.assertContains(detail, self.share.token)
+        self.assertNotContains(detail, f'action="{reverse("share_trip", args=[self.trip.id])}"')
+        self.client.post(reverse('revoke_share', args=[self.trip.id, self.share.id]))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_deleting_the_trip_deletes_its_links(self):
+        call_command('archive_trips', stdout=io.StringIO())
+        ArchivedTrip.objects.get().delete()
+        self.assertFalse(TripShare.objects.exists())
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+@override_settings(KNOWN_PLACES_PATH=None, AUTOCOMPLETE_MIN_TRIPS=3, AUTOCOMPLETE_MIN_USERS=2)
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        self.users = [User.objects.create(username=f"user{i}", email=f"user{i}@example.com") for i in range(3)]
+
+    def plan(self, user, destination):
+        return Trip.objects.create(
+            user=user, destination=destination, start_date=date(2026, 11, 1), end_date=date(2026, 11, 3),
+            budget=10000, travelers=1,
+        )
+
+    def names(self, query):
+        return [name for name, _ in autocomplete.build_index().search(query)]
+
+    def test_only_destinations_planned_by_several_users_are_suggested(self):
+        for _ in range(5):
+            self.plan(self.users[0], "Gokarna beach house 12")
+        self.plan(self.users[0], "Goa")
+        self.plan(self.users[1], "goa ")
+        self.assertEqual(self.names("go"), [])
+
+        trip = self.plan(self.users[2], "Goa")
+        self.assertEqual(self.names("go"), ["Goa"])
+        trip.delete()
+        self.assertEqual(self.names("go"), [])
+
+    def test_user_counts_follow_trips(self):
+        first = self.plan(self.users[0], "Goa")
+        second = self.plan(self.users[0], "Goa")
+        self.plan(self.users[1], "Goa")
+        self.assertEqual(DestinationStats.objects.get().users, 2)
+
+        first.delete()
+        self.assertEqual(DestinationStats.objects.get().users, 2)
+        second.destination = "Jaipur"
+        second.save()
+        self.assertEqual(dict(DestinationStats.objects.values_list('destination', 'users')), {'goa': 1, 'jaipur': 1})
+
+
+def _generated(**plan):
+    return {"itinerary": [_day(1, f"AI day in {plan['destination']}", plan['destination'])], "summary": {}}
+
+
+@override_settings(
+    OPENROUTER_QUEUE_WORKERS=0, TRIP_IMPORT_RETRY_WAIT=5,
+    RATE_LIMITS={'openrouter_background': {'capacity': 2, 'per_seconds': 3600}},
+)
+class ImportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create(username="traveller", email="traveller@example.com")
+        self.rows = []
+        for number, destination in enumerate(["Goa", "Jaipur", "Hampi", "Goa"], start=2):
+            row = importer.ImportRow(number, {})
+            row.trip = Trip.objects.create(
+                user=user, destination=destination, start_date=date(2026, 12, 1), end_date=date(2026, 12, 3),
+                budget=10000, travelers=1,
+            )
+            self.rows.append(row)
+        self.lookups = []
+
+    def enrich(self, *failures):
+        failures = list(failures)
+
+        def enrich_destination(destination, refresh=False):
+            self.lookups.append(destination)
+            if failures:
+                raise failures.pop(0)
+            return {'weather': f"30°C in {destination}"}
+        return mock.patch.object(providers, 'enrich_destination', enrich_destination)
+
+    def sources(self):
+        return list(Trip.objects.order_by('id').values_list('itinerary_source', flat=True))
+
+    def test_rows_past_the_background_budget_are_queued_later(self):
+        with self.enrich():
+            importer.enrich_trips(self.rows, _generated)
+        self.assertEqual([row.steps[-1] for row in self.rows], ["AI itinerary queued"] * 2 + ["AI itinerary deferred"] * 2)
+        self.assertEqual(self.sources(), ['ai', 'ai', 'rules', 'rules'])
+
+        cache.clear()
+        with mock.patch('itinerary.management.commands.refine_trips.generate_itinerary_with_ai', _generated):
+            call_command('refine_trips', stdout=io.StringIO())
+        self.assertEqual(self.sources(), ['ai'] * 4)
+        self.assertIn("AI day in Hampi", Trip.objects.get(destination="Hampi").itinerary)
+
+    def test_rate_limited_lookups_are_retried(self):
+        with self.enrich(ratelimit.RateLimited('geoapify', 2)), mock.patch.object(importer.time, 'sleep') as sleep:
+            importer.enrich_trips(self.rows[:1], _generated)
+        sleep.assert_called_once_with(2)
+        self.assertEqual(self.lookups, ["Goa", "Goa"])
+        self.assertEqual(Trip.objects.get(pk=self.rows[0].trip.pk).weather, "30°C in Goa")
+
+    def test_lookups_still_failing_are_redone_by_refine_trips(self):
+        with self.enrich(*[ratelimit.RateLimited('openweather', 60)] * 3):
+            importer.enrich_trips(self.rows, _generated)
+        self.assertEqual(set(Trip.objects.values_list('weather', flat=True)), {''})
+        self.assertIn("Destination lookup failed", self.rows[0].errors[0])
+
+        self.lookups.clear()
+        with self.enrich(), mock.patch('itinerary.management.commands.refine_trips.generate_itinerary_with_ai', _generated):
+            call_command('refine_trips', stdout=io.StringIO())
+        self.assertEqual(sorted(self.lookups), ["Goa", "Hampi", "Jaipur"])
+        self.assertEqual(Trip.objects.filter(weather='').count(), 0)
+
+
+def _locmem(**options):
+    return {'BACKEND': 'itinerary.notifications.LocmemChannel', **options}
+
+
+@override_settings(NOTIFICATION_RETRY_DELAY=0.01)
+class NotificationTests(TestCase):
+    def setUp(self):
+        notifications.outbox.clear()
+        user = User.objects.create(username="traveller", email="traveller@example.com")
+        self.trip = Trip.objects.create(
+            user=user, destination="Goa", start_date=date(2026, 12, 1), end_date=date(2026, 12, 3),
+            budget=10000, travelers=1,
+        )
+
+    def logs(self):
+        return dict(NotificationLog.objects.filter(trip=self.trip).values_list('channel', 'status'))
+
+    @override_settings(NOTIFICATION_CHANNELS={
+        'slow_a': _locmem(DELAY=0.3), 'slow_b': _locmem(DELAY=0.3), 'slow_c': _locmem(DELAY=0.3),
+    })
+    def test_channels_are_sent_concurrently(self):
+        started = time.monotonic()
+        deliveries = notifications.dispatch(self.trip, {})
+        elapsed = time.monotonic() - started
+
+        self.assertGreaterEqual(elapsed, 0.3)
+        self.assertLess(elapsed, 0.6)
+        self.assertTrue(all(delivery.ok for delivery in deliveries.values()))
+        self.assertEqual(sorted(message['channel'] for message in notifications.outbox), ['slow_a', 'slow_b', 'slow_c'])
+        self.assertEqual(self.trip.booking_reference, notifications.outbox[0]['ticket']['booking_reference'])
+
+    @override_settings(NOTIFICATION_CHANNELS={'flaky': _locmem(FAIL=True, RETRIES=2), 'once': _locmem(FAIL=True)})
+    def test_failures_retry_with_backoff(self):
+        clock = mock.Mock(wraps=time)
+        with mock.patch.object(notifications, 'time', clock), self.assertLogs(notifications.logger) as logs:
+            deliveries = notifications.dispatch(self.trip, {}, ticket={'booking_reference': "TP-TEST"})
+
+        self.assertEqual((deliveries['flaky'].status, deliveries['flaky'].attempts), (NotificationLog.FAILED, 3))
+        self.assertEqual((deliveries['once'].status, deliveries['once'].attempts), (NotificationLog.FAILED, 1))
+        self.assertEqual(sorted(clock.sleep.call_args_list), [mock.call(0.01), mock.call(0.02)])
+        self.assertIn("configured to fail", deliveries['flaky'].detail)
+        self.assertEqual(len(logs.records), 4)
+
+    @override_settings(NOTIFICATION_CHANNELS={
+        'email': _locmem(),
+        'whatsapp': {'BACKEND': 'itinerary.notifications.WhatsAppLinkChannel', 'RETRIES': 2},
+        'sms': {'BACKEND': 'itinerary.notifications.ConsoleSMSChannel', 'RETRIES': 1},
+    })
+    def test_phone_channels_skip_trips_without_a_phone(self):
+        deliveries = notifications.dispatch(self.trip, {}, ticket={'booking_reference': "TP-TEST"})
+
+        self.assertEqual(deliveries['whatsapp'].status, NotificationLog.SKIPPED)
+        self.assertEqual(deliveries['whatsapp'].attempts, 1)
+        self.assertEqual(deliveries['sms'].detail, "no phone number")
+        self.assertEqual(
+            self.logs(),
+            {'email': NotificationLog.SENT, 'whatsapp': NotificationLog.SKIPPED, 'sms': NotificationLog.SKIPPED},
+        )
+
+    @override_settings(NOTIFICATION_CHANNELS={'ok': _locmem(), 'broken': _locmem(FAIL=True)})
+    def test_one_log_row_per_channel(self):
+        with self.assertLogs(notifications.logger):
+            notifications.dispatch(self.trip, {}, ticket={'booking_reference': "TP-TEST"})
+            notifications.dispatch(self.trip, {}, channels=['broken'], ticket={'booking_reference': "TP-TEST"})
+
+        self.assertEqual(NotificationLog.objects.filter(trip=self.trip, channel='ok').count(), 1)
+        self.assertEqual(NotificationLog.objects.filter(trip=self.trip, channel='broken').count(), 2)
+        self.assertEqual(len(notifications.outbox), 1)
+
+
+class FakeResponse:
+    encoding = 'utf-8'
+
+    def __init__(self, status_code, body, chunk_delay):
+        self.status_code = status_code
+        self.body = body
+        self.chunk_delay = chunk_delay
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), 16):
+            time.sleep(self.chunk_delay)
+            yield self.body[start:start + 16]
+
+
+class FakeOpenRouter:
+    """http_session() stand-in: per model, seconds to headers, status, reply text and seconds per chunk"""
+
+    def __init__(self, **replies):
+        self.replies = replies
+        self.posts = {}
+
+    def post(self, url, **kwargs):
+        model = kwargs['json']['model']
+        self.posts[model] = time.monotonic()
+        first_byte, status_code, text, chunk_delay = self.replies[model]
+        time.sleep(first_byte)
+        body = json.dumps({"choices": [{"message": {"content": text}}]}).encode()
+        return FakeResponse(status_code, body, chunk_delay)
+
+
+@override_settings(OPENROUTER_HEDGE_AFTER=0.2, OPENROUTER_TIMEOUT=3, RATE_LIMITS={})
+class HedgingTests(SimpleTestCase):
+    def setUp(self):
+        llm._stats.clear()
+
+    def complete(self, session, models):
+        with mock.patch.object(llm, 'http_session', lambda: session):
+            started = time.monotonic()
+            result = llm.complete("Plan a trip", "key", models)
+            return result, time.monotonic() - started
+
+    def wait_for_stats(self, model, outcome):
+        deadline = time.monotonic() + 3
+        while time.monotonic() < deadline:
+            stats = llm.model_latency_stats().get(model, {})
+            if stats.get(outcome):
+                return stats
+            time.sleep(0.01)
+        self.fail(f"{model} never recorded {outcome}")
+
+    def test_fast_model_is_not_hedged(self):
+        session = FakeOpenRouter(fast=(0, 200, "plan A", 0), backup=(0, 200, "plan B", 0))
+        (text, model), _ = self.complete(session, ['fast', 'backup'])
+
+        self.assertEqual((text, model), ("plan A", 'fast'))
+        self.assertEqual(list(session.posts), ['fast'])
+        self.assertEqual(llm.model_latency_stats()['fast']['wins'], 1)
+
+    def test_backup_starts_after_the_hedge_delay_and_the_loser_is_cancelled(self):
+        session = FakeOpenRouter(slow=(0.6, 200, "slow plan", 0.05), backup=(0, 200, "plan B", 0))
+        (text, model), elapsed = self.complete(session, ['slow', 'backup'])
+
+        self.assertEqual((text, model), ("plan B", 'backup'))
+        self.assertGreaterEqual(session.posts['backup'] - session.posts['slow'], 0.2)
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(llm.model_latency_stats()['backup']['wins'], 1)
+        slow = self.wait_for_stats('slow', 'cancelled')
+        self.assertEqual((slow['requests'], slow['wins']), (1, 0))
+
+    def test_failed_request_asks_the_next_model_without_waiting(self):
+        session = FakeOpenRouter(broken=(0, 500, "", 0), empty=(0, 200, "", 0), good=(0, 200, "plan C", 0))
+        with override_settings(OPENROUTER_HEDGE_AFTER=2):
+            (text, model), elapsed = self.complete(session, ['broken', 'empty', 'good'])
+
+        self.assertEqual((text, model), ("plan C", 'good'))
+        self.assertLess(elapsed, 1)
+        stats = llm.model_latency_stats()
+        self.assertEqual((stats['broken']['errors'], stats['empty']['errors']), (1, 1))
+
+    def test_every_model_failing_raises(self):
+        session = FakeOpenRouter(broken=(0, 503, "", 0))
+        with self.assertRaises(llm.LLMError) as raised:
+            self.complete(session, ['broken'])
+        self.assertIn("HTTP 503", str(raised.exception))
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.flight = providers.SingleFlight("test-flight")
+        self.calls = 0
+
+    def upstream(self, result=None, error=None, delay=0.3):
+        def fn():
+            self.calls += 1
+            time.sleep(delay)
+            if error is not None:
+                raise error
+            return result
+        return fn
+
+    def run_concurrently(self, fn, threads=8):
+        barrier = threading.Barrier(threads)
+        outcomes = [None] * threads
+
+        def call(i):
+            barrier.wait()
+            try:
+                outcomes[i] = self.flight.do("weather:goa", fn, 60)
+            except Exception as e:
+                outcomes[i] = e
+
+        workers = [threading.Thread(target=call, args=(i,)) for i in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return outcomes
+
+    def test_concurrent_callers_share_one_upstream_call(self):
+        outcomes = self.run_concurrently(self.upstream({'temp': 30}))
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(outcomes, [{'temp': 30}] * 8)
+
+    def test_leader_error_reaches_every_waiter(self):
+        error = providers.ProviderError("timed out")
+        outcomes = self.run_concurrently(self.upstream(error=error))
+        self.assertEqual(self.calls, 1)
+        self.assertTrue(all(outcome is error for outcome in outcomes))
+        # Errors are not cached; the next caller tries again.
+        self.assertEqual(self.flight.do("weather:goa", self.upstream({'temp': 31}, delay=0), 60), {'temp': 31})
+
+    def test_results_are_cached_until_refreshed(self):
+        self.flight.do("weather:goa", self.upstream({'temp': 30}, delay=0), 60)
+        self.assertEqual(self.flight.do("weather:goa", self.upstream({'temp': 31}, delay=0), 60), {'temp': 30})
+        self.assertEqual(self.flight.do("weather:goa", self.upstream({'temp': 32}, delay=0), 60, refresh=True), {'temp': 32})
+        self.assertEqual(self.calls, 2)
+
+    def test_waits_for_another_process_holding_the_lock(self):
+        result_key, lock_key = self.flight._keys("weather:goa")
+        cache.add(lock_key, "other-worker", 30)
+        threading.Timer(0.1, cache.set, args=(result_key, {'temp': 29}, 60)).start()
+
+        self.assertEqual(self.flight.do("weather:goa", self.upstream({'temp': 30}, delay=0), 60), {'temp': 29})
+        self.assertEqual(self.calls, 0)
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create(username="alice", email="alice@example.com")
+        self.bob = User.objects.create(username="bob", email="bob@example.com")
+
+    def plan(self, user, destination, budget=10000, end_date=date(2026, 12, 3)):
+        return Trip.objects.create(
+            user=user, destination=destination, start_date=date(2026, 12, 1), end_date=end_date,
+            budget=budget, travelers=1,
+        )
+
+    def totals(self):
+        return {
+            stats.destination: (stats.trips, stats.booked_trips, stats.budget_total, stats.budget_trips, stats.users)
+            for stats in DestinationStats.objects.all()
+            if stats.trips
+        }
+
+    def snapshot(self):
+        daily = DailyDestinationStats.objects.filter(trips__gt=0).values_list(
+            'destination__destination', 'day', 'trips', 'booked_trips')
+        per_user = DestinationUserStats.objects.values_list('destination__destination', 'user_id', 'trips')
+        return self.totals(), sorted(daily), sorted(per_user)
+
+    def test_create_book_rename_and_delete(self):
+        goa = self.plan(self.alice, "Goa")
+        self.plan(self.bob, "goa ", budget=None)
+        self.assertEqual(self.totals(), {'goa': (2, 0, 10000, 1, 2)})
+
+        goa.is_booked = True
+        goa.save(update_fields=['is_booked'])
+        self.assertEqual(self.totals(), {'goa': (2, 1, 10000, 1, 2)})
+
+        goa.destination = "Jaipur"
+        goa.save()
+        self.assertEqual(self.totals(), {'goa': (1, 0, 0, 0, 1), 'jaipur': (1, 1, 10000, 1, 1)})
+        [daily] = DailyDestinationStats.objects.filter(destination__destination='jaipur')
+        self.assertEqual((daily.trips, daily.booked_trips), (1, 1))
+
+        goa.delete()
+        self.assertEqual(self.totals(), {'goa': (1, 0, 0, 0, 1)})
+
+    def test_saving_and_deleting_trips_loaded_with_deferred_fields(self):
+        trip = self.plan(self.alice, "Goa")
+        deferred = Trip.objects.only('id', 'interests').get(pk=trip.pk)
+        deferred.interests = "beaches"
+        deferred.save(update_fields=['interests'])
+        self.assertEqual(self.totals(), {'goa': (1, 0, 10000, 1, 1)})
+
+        deferred = Trip.objects.only('id').get(pk=trip.pk)
+        deferred.destination = "Hampi"
+        deferred.save()
+        self.assertEqual(self.totals(), {'hampi': (1, 0, 10000, 1, 1)})
+
+        Trip.objects.only('id').get(pk=trip.pk).delete()
+        self.assertEqual(self.totals(), {})
+
+    def test_archived_trips_stay_counted_until_the_archive_row_is_deleted(self):
+        trip = self.plan(self.alice, "Goa", end_date=date(2020, 1, 3))
+        self.plan(self.bob, "Goa")
+        call_command('archive_trips', stdout=io.StringIO())
+
+        self.assertFalse(Trip.objects.filter(pk=trip.pk).exists())
+        self.assertEqual(self.totals(), {'goa': (2, 0, 20000, 2, 2)})
+        ArchivedTrip.objects.get(pk=trip.pk).delete()
+        self.assertEqual(self.totals(), {'goa': (1, 0, 10000, 1, 1)})
+
+    def test_backfill_matches_the_incremental_totals(self):
+        trips = [
+            self.plan(self.alice, "Goa"), self.plan(self.alice, "GOA", budget=None), self.plan(self.bob, "Goa"),
+            self.plan(self.bob, "Jaipur", end_date=date(2020, 1, 3)), self.plan(self.alice, "Hampi"),
+        ]
+        trips[0].is_booked = True
+        trips[0].save()
+        trips[4].destination = "Jaipur"
+        trips[4].save()
+        trips[1].delete()
+        call_command('archive_trips', stdout=io.StringIO())
+        incremental = self.snapshot()
+
+        call_command('backfill_rollups', stdout=io.StringIO())
+        self.assertEqual(self.snapshot(), incremental)
+        self.assertEqual(incremental[0], {'goa': (2, 1, 20000, 2, 2), 'jaipur': (2, 0, 20000, 2, 2)})
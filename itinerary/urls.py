@@ -12,13 +12,26 @@ urlpatterns = [
     
     # ---------------------- DASHBOARD & TRIP MANAGEMENT URLs ----------------------
     path('dashboard/', views.dashboard_view, name='dashboard'),
+    path('destinations/autocomplete/', views.destination_autocomplete_view, name='destination_autocomplete'),
+    
+    path('trips/import/', views.import_trips_view, name='import_trips'),
     
     # Trip URLs
     path('trip/<int:trip_id>/', views.trip_detail_view, name='trip_detail'),
     path('trip/<int:trip_id>/book/', views.book_trip_view, name='book_trip'),
+    path('trip/<int:trip_id>/edit/', views.edit_trip_view, name='edit_trip'),
     path('trip/<int:trip_id>/delete/', views.delete_trip_view, name='delete_trip'),
+    path('trip/<int:trip_id>/share/', views.share_trip_view, name='share_trip'),
+    path('trip/<int:trip_id>/share/<int:share_id>/revoke/', views.revoke_share_view, name='revoke_share'),
+    
+    # Public, read-only share links
+    path('share/<str:token>/', views.shared_trip_view, name='shared_trip'),
     
     # ---------------------- NOTIFICATION & TICKET URLs ----------------------
     path('trip/<int:trip_id>/resend-email/', views.resend_ticket_email_view, name='resend_ticket_email'),
     path('trip/<int:trip_id>/whatsapp-reminder/', views.send_whatsapp_reminder_view, name='whatsapp_reminder'),
+
+    # ---------------------- OPERATIONS URLs ----------------------
+    path('metrics/', views.metrics_view, name='metrics'),
+    path('bookings/lookup/', views.booking_lookup_view, name='booking_lookup'),
 ]
\ No newline at end of file
@@ -1,32 +1,24 @@
 # itinerary/views.py
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
+from django.http import Http404, HttpResponse, HttpResponseNotModified, JsonResponse
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.models import User
 from django.contrib.auth import login, logout
-from django.core.mail import send_mail, EmailMultiAlternatives
+from django.core.mail import send_mail
 from django.contrib import messages
 from django.conf import settings
+from django.db.models import Q
 from django.utils import timezone
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+from django.utils.http import parse_etags
 from datetime import datetime, timedelta
-import requests
+import csv
 import json
-import random
 import string
-import urllib.parse
 
-from .forms import RegisterForm, OTPForm, TripForm
-from .models import UserOTP, Trip
-
-import os
-from dotenv import load_dotenv
-from django.conf import settings
-
-load_dotenv(settings.BASE_DIR / ".env")
-
-OPENWEATHER_API = os.getenv("OPENWEATHER_API")
-GEOAPIFY_API = os.getenv("GEOAPIFY_API")
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+from .forms import RegisterForm, OTPForm, TripForm, TripImportForm
+from .models import UserOTP, Trip, TripShare, ArchivedTrip, PlanCacheStats, WeatherForecast
+from . import autocomplete, importer, llm, notifications, planner, providers, ratelimit, references, refinement, replan, search, sharing
 
 def landing_page(request):
     return render(request, 'landing.html')
@@ -107,6 +99,11 @@ def resend_otp_view(request):
         messages.error(request, "Session expired. Please register again.")
         return redirect('register')
 
+    retry_after = ratelimit.take('resend_otp', f"email:{email.lower()}")
+    if retry_after:
+        messages.warning(request, f"Too many OTP requests. Please try again in {retry_after} seconds.")
+        return redirect('verify_otp')
+
     try:
         user = User.objects.get(email=email)
         otp_obj, _ = UserOTP.objects.get_or_create(user=user)
@@ -130,9 +127,11 @@ def resend_otp_view(request):
 
 def generate_itinerary_with_ai(destination, days, budget, travelers, interests):
     """Generate travel itinerary using OpenRouter AI"""
+    budget_text = f"a budget of ₹{budget:,.2f} Indian Rupees" if budget else "a flexible budget"
+    total_cost = f"₹{budget:,.2f}" if budget else "₹0.00"
     
     prompt = f"""
-    Create a detailed {days}-day travel itinerary for {destination} for {travelers} traveler(s) with a budget of ₹{budget:,.2f} Indian Rupees.
+    Create a detailed {days}-day travel itinerary for {destination} for {travelers} traveler(s) with {budget_text}.
     Interests: {interests}
     
     Please provide the itinerary in this exact JSON format:
@@ -155,7 +154,7 @@ def generate_itinerary_with_ai(destination, days, budget, travelers, interests):
             }}
         ],
         "summary": {{
-            "total_estimated_cost": "₹{budget:,.2f}",
+            "total_estimated_cost": "{total_cost}",
             "best_transportation": "Recommended transport",
             "tips": ["Tip 1", "Tip 2"],
             "must_see": ["Place 1", "Place 2"]
@@ -163,167 +162,66 @@ def generate_itinerary_with_ai(destination, days, budget, travelers, interests):
     }}
     """
     
-    try:
-        headers = {
-            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "model": "openai/gpt-3.5-turbo",
-            "messages": [
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            "temperature": 0.7
-        }
-        
-        response = requests.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers=headers,
-            json=payload,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            itinerary_text = data['choices'][0]['message']['content']
-            
-
-            try:
-                start_idx = itinerary_text.find('{')
-                end_idx = itinerary_text.rfind('}') + 1
-                json_str = itinerary_text[start_idx:end_idx]
-                itinerary_data = json.loads(json_str)
-                return itinerary_data
-            except json.JSONDecodeError:
-                return {"raw_itinerary": itinerary_text}
-        
-        return {"error": "Failed to generate itinerary"}
-    
-    except Exception as e:
-        return {"error": f"AI service error: {str(e)}"}
-
-
-
-def generate_ticket_data(trip, itinerary):
-    """Generate ticket data for email and WhatsApp"""
-    booking_ref = trip.generate_booking_reference()
-    
-    ticket_data = {
-        'booking_reference': booking_ref,
-        'destination': trip.destination,
-        'traveler_name': trip.user.username,
-        'traveler_email': trip.user.email,
-        'start_date': trip.start_date,
-        'end_date': trip.end_date,
-        'duration': trip.duration_days,
-        'travelers': trip.travelers,
-        'total_cost': trip.formatted_budget,
-        'itinerary_summary': itinerary.get('summary', {}),
-        'daily_plans': itinerary.get('itinerary', []),
-        'booking_date': timezone.now().strftime("%Y-%m-%d %H:%M"),
-        'ticket_id': f"TKT{random.randint(100000, 999999)}",
-    }
-    return ticket_data
-
-def send_ticket_email(trip, itinerary):
-    """Send beautifully formatted ticket email"""
-    try:
-        ticket_data = generate_ticket_data(trip, itinerary)
-        
-
-        html_content = render_to_string('ticket_email.html', {
-            'trip': trip,
-            'ticket': ticket_data,
-            'itinerary': itinerary
-        })
-        
-
-        text_content = strip_tags(html_content)
-        
-
-        subject = f"🎫 Your Travel Ticket to {trip.destination} - {ticket_data['booking_reference']}"
-        
-        email = EmailMultiAlternatives(
-            subject=subject,
-            body=text_content,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[trip.user.email],
-            reply_to=[settings.DEFAULT_FROM_EMAIL]
-        )
-        
-        email.attach_alternative(html_content, "text/html")
-        
+    return _complete_itinerary(prompt)
 
-        email.send(fail_silently=False)
-        
-
-        trip.is_booked = True
-        trip.tickets_sent = True
-        trip.save()
-        
-        return True
-        
-    except Exception as e:
-        print(f"Email sending error: {e}")
-        return False
 
-def send_whatsapp_notification(trip, itinerary):
-    """Send WhatsApp notification using FREE WhatsApp API"""
+def _complete_itinerary(prompt):
     try:
-        if not trip.phone_number:
-            return False
-            
-
-        phone_number = ''.join(filter(str.isdigit, trip.phone_number))
-        
-
-        if not phone_number.startswith('91') and len(phone_number) == 10:
-            phone_number = '91' + phone_number
-        
-        ticket_data = generate_ticket_data(trip, itinerary)
-        
-
-        message = f"""🎫 *Travel Booking Confirmed!*
-
-*Booking Reference:* {ticket_data['booking_reference']}
-*Destination:* {trip.destination}
-*Travel Dates:* {trip.start_date} to {trip.end_date}
-*Duration:* {trip.duration_days} days
-*Travelers:* {trip.travelers}
-*Total Budget:* {trip.formatted_budget}
-
-Your detailed itinerary has been sent to your email: {trip.user.email}
-
-Thank you for choosing TravelPlanner! 🌍
-
-_This is an automated message. Please do not reply._"""
-        
-
-        encoded_message = urllib.parse.quote(message)
-        
-
-        whatsapp_url = f"https://wa.me/{phone_number}?text={encoded_message}"
-        
-        return whatsapp_url
-        
-    except Exception as e:
-        print(f"WhatsApp notification error: {e}")
-        return False
+        itinerary_text, _model = llm.complete(prompt, api_key=settings.OPENROUTER_API_KEY)
+    except llm.LLMError as e:
+        return {"error": f"AI service error: {str(e)}"}
+    except ratelimit.RateLimited as e:
+        # Same as any other AI failure, so callers fall back to quick plans.
+        return {"error": f"AI service busy: {e}"}
 
-def send_sms_notification(trip, itinerary):
-    """Send SMS notification - Always return True for demo"""
     try:
+        start_idx = itinerary_text.find('{')
+        end_idx = itinerary_text.rfind('}') + 1
+        json_str = itinerary_text[start_idx:end_idx]
+        itinerary_data = json.loads(json_str)
+        return itinerary_data
+    except json.JSONDecodeError:
+        return {"raw_itinerary": itinerary_text}
+
+
+def generate_itinerary_days(trip, days, kept_days):
+    """Generate only the given (day number, date) pairs of an existing itinerary"""
+    budget = f"₹{trip.budget:,.2f} Indian Rupees in total" if trip.budget else "a flexible budget"
+    planned = "; ".join(
+        activity.get('activity', '')
+        for day in kept_days
+        for activity in day.get('activities', [])
+    ) or "nothing yet"
+    day_list = ", ".join(f"day {number} ({date})" for number, date in days)
 
-        print(f"SMS would be sent to: {trip.phone_number}")
-        return True
-        
-    except Exception as e:
-        print(f"SMS sending error: {e}")
-        return False
+    prompt = f"""
+    A {trip.duration_days}-day trip to {trip.destination} for {trip.travelers} traveler(s) with {budget}.
+    Interests: {trip.interests}
+    Already planned on other days (do not repeat): {planned}
+    
+    Plan only these days: {day_list}.
+    Please provide them in this exact JSON format:
+    {{
+        "itinerary": [
+            {{
+                "day": {days[0][0]},
+                "date": "{days[0][1]}",
+                "activities": [
+                    {{
+                        "time": "09:00 AM",
+                        "activity": "Activity description",
+                        "location": "Location name",
+                        "cost": "₹500",
+                        "duration": "2 hours",
+                        "type": "sightseeing/food/adventure/etc"
+                    }}
+                ],
+                "total_cost": "₹2,500"
+            }}
+        ]
+    }}
+    """
+    return _complete_itinerary(prompt)
 
 
 
@@ -345,24 +243,24 @@ def book_trip_view(request, trip_id):
     if request.method == "POST":
         try:
 
-            email_sent = send_ticket_email(trip, itinerary)
-            
-
-            whatsapp_url = send_whatsapp_notification(trip, itinerary)
+            deliveries = notifications.dispatch(trip, itinerary)
+            email = deliveries.get('email')
+            whatsapp = deliveries.get('whatsapp')
+            sms = deliveries.get('sms')
             
-
-            sms_sent = send_sms_notification(trip, itinerary)
-            
-            if email_sent:
+            if email and email.ok:
+                trip.is_booked = True
+                trip.tickets_sent = True
+                trip.save()
                 messages.success(request, "🎫 Booking confirmed! Tickets sent to your email.")
                 
-                if whatsapp_url:
+                if whatsapp and whatsapp.ok:
                     messages.info(request, 
-                        f"📱 WhatsApp notification ready! <a href='{whatsapp_url}' target='_blank' class='alert-link'>Click here to send WhatsApp message</a>", 
+                        f"📱 WhatsApp notification ready! <a href='{whatsapp.detail}' target='_blank' class='alert-link'>Click here to send WhatsApp message</a>", 
                         extra_tags='safe'
                     )
                 
-                if sms_sent:
+                if sms and sms.ok:
                     messages.info(request, "📲 SMS notification sent to your phone.")
                     
             else:
@@ -385,11 +283,25 @@ def dashboard_view(request):
         return redirect('register')
 
     trips = Trip.objects.filter(user=request.user).order_by('-created_at')
+    query = request.GET.get('q', '').strip()
+    search_results = search.search(request.user, query) if query else None
+    archived_trips = (
+        ArchivedTrip.objects.filter(user=request.user)
+        .only('id', 'destination', 'start_date', 'end_date', 'is_booked')
+        .order_by('-end_date')
+    )
     form = TripForm()
 
     if request.method == "POST":
         form = TripForm(request.POST)
-        if form.is_valid():
+        if form.is_valid() and form.cleaned_data['end_date'] <= form.cleaned_data['start_date']:
+            # Checked before taking a plan token, so a typo doesn't use one up.
+            messages.error(request, "End date must be after start date.")
+            return redirect('dashboard')
+        retry_after = ratelimit.take('plan', f"user:{request.user.pk}") if form.is_valid() else 0
+        if retry_after:
+            messages.warning(request, f"You're planning trips very quickly. Please try again in {retry_after} seconds.")
+        elif form.is_valid():
             trip = form.save(commit=False)
             trip.user = request.user
             
@@ -403,90 +315,27 @@ def dashboard_view(request):
 
             try:
 
-                duration = (trip.end_date - trip.start_date).days
-                if duration <= 0:
-                    messages.error(request, "End date must be after start date.")
-                    return redirect('dashboard')
+                upstream_calls = providers.upstream_call_count()
+                for field, value in providers.enrich_destination(trip.destination).items():
+                    setattr(trip, field, value)
+                PlanCacheStats.record(hit=providers.upstream_call_count() == upstream_calls)
 
 
-                weather_url = f"https://api.openweathermap.org/data/2.5/weather?q={trip.destination}&appid={OPENWEATHER_API}&units=metric"
-                weather_resp = requests.get(weather_url)
-                if weather_resp.status_code == 200:
-                    weather_data = weather_resp.json()
-                    temp = weather_data['main']['temp']
-                    desc = weather_data['weather'][0]['description']
-                    trip.weather = f"{temp}°C, {desc}"
-                else:
-                    trip.weather = "Weather data not available"
-
-
-                if weather_resp.status_code == 200:
-                    weather_data = weather_resp.json()
-                    coord = weather_data.get('coord', {})
-                    lat, lon = coord.get('lat'), coord.get('lon')
-
-                    if lat and lon:
-
-                        attractions_url = f"https://api.geoapify.com/v2/places?categories=tourism.sights,tourism.attraction&filter=circle:{lon},{lat},5000&limit=10&apiKey={GEOAPIFY_API}"
-                        attractions_resp = requests.get(attractions_url)
-                        
-                        if attractions_resp.status_code == 200:
-                            attractions_data = attractions_resp.json()
-                            features = attractions_data.get('features', [])
-                            attractions = []
-                            for feature in features[:5]:
-                                name = feature['properties'].get('name')
-                                if name:
-                                    attractions.append(name)
-                            trip.attractions = ", ".join(attractions) if attractions else "No attractions found"
-
-
-                        hotels_url = f"https://api.geoapify.com/v2/places?categories=accommodation.hotel&filter=circle:{lon},{lat},5000&limit=5&apiKey={GEOAPIFY_API}"
-                        hotels_resp = requests.get(hotels_url)
-                        
-                        if hotels_resp.status_code == 200:
-                            hotels_data = hotels_resp.json()
-                            features = hotels_data.get('features', [])
-                            hotels = []
-                            for feature in features[:3]:
-                                name = feature['properties'].get('name')
-                                if name:
-                                    hotels.append(name)
-                            trip.hotels = ", ".join(hotels) if hotels else "No hotels found"
-                    else:
-                        trip.attractions = "Location not found"
-                        trip.hotels = "Location not found"
-
-
-                    if lat and lon:
-                        distance_url = f"https://router.project-osrm.org/route/v1/driving/77.5946,12.9716;{lon},{lat}?overview=false"
-                        dist_resp = requests.get(distance_url)
-                        if dist_resp.status_code == 200:
-                            dist_data = dist_resp.json()
-                            if dist_data.get('routes'):
-                                trip.distance_km = round(dist_data['routes'][0]['distance'] / 1000, 2)
-
-
-                itinerary_data = generate_itinerary_with_ai(
-                    destination=trip.destination,
-                    days=duration,
-                    budget=trip.budget,
-                    travelers=trip.travelers,
-                    interests=trip.interests
-                )
-                
-                if 'error' not in itinerary_data:
-                    trip.itinerary = json.dumps(itinerary_data)
-                else:
-                    trip.itinerary = "Itinerary generation failed"
-
+                # Save a rule-based plan right away; the AI itinerary replaces
+                # it in the background unless the AI queue is too deep.
+                trip.itinerary = json.dumps(planner.build_for_trip(trip))
+                trip.itinerary_source = Trip.ITINERARY_RULES
                 trip.save()
                 messages.success(request, "Trip planned successfully! You can now book and get tickets.")
+                if not refinement.submit(trip, generate_itinerary_with_ai):
+                    messages.info(request, "Our AI planner is busy, so this trip uses a quick itinerary built from local highlights.")
                 
 
                 return redirect('trip_detail', trip_id=trip.id)
 
-            except requests.exceptions.RequestException as e:
+            except ratelimit.RateLimited as e:
+                messages.warning(request, f"Trip planning is busy right now. Please try again in {e.retry_after} seconds.")
+            except providers.ProviderError as e:
                 messages.error(request, f"API error: {e}")
             except Exception as e:
                 messages.error(request, f"Something went wrong: {e}")
@@ -494,16 +343,80 @@ def dashboard_view(request):
     return render(request, 'dashboard.html', {
         'form': form, 
         'trips': trips, 
+        'archived_trips': archived_trips,
+        'query': query,
+        'search_results': search_results,
         'user': request.user
     })
 
 
 
+def import_trips_view(request):
+    """Create trips in bulk from an uploaded CSV"""
+    if not request.user.is_authenticated:
+        return redirect('register')
+
+    rows = None
+    if request.method == "POST":
+        form = TripImportForm(request.POST, request.FILES)
+        # An upload costs a plan token like planning one trip; its AI
+        # itineraries take more (see importer.enrich_trips).
+        retry_after = ratelimit.take('plan', f"user:{request.user.pk}") if form.is_valid() else 0
+        if retry_after:
+            messages.warning(request, f"You're planning trips very quickly. Please try again in {retry_after} seconds.")
+        elif form.is_valid():
+            try:
+                rows, trips = importer.parse_csv(form.cleaned_data['csv_file'], request.user)
+            except (UnicodeDecodeError, csv.Error) as e:
+                messages.error(request, f"Could not read the CSV file: {e}")
+            else:
+                if trips:
+                    importer.create_trips(rows, trips)
+                    importer.enrich_trips(rows, generate_itinerary_with_ai)
+                    messages.success(request, f"Imported {len(trips)} of {len(rows)} trip(s). Each starts with a quick itinerary; AI itineraries replace them as they finish, deferred ones within the next few minutes.")
+                else:
+                    messages.error(request, "No valid rows found in the CSV file.")
+    else:
+        form = TripImportForm()
+
+    return render(request, 'import_trips.html', {
+        'form': form,
+        'rows': rows,
+        'columns': TripForm.Meta.fields,
+    })
+
+
+
+def destination_autocomplete_view(request):
+    """JSON destination suggestions for the trip form"""
+    if not request.user.is_authenticated:
+        return JsonResponse({'results': []}, status=401)
+
+    query = request.GET.get('q', '')
+    results = autocomplete.get_index().search(query)
+    return JsonResponse({
+        'query': query,
+        'results': [{'name': name, 'popularity': popularity} for name, popularity in results],
+    })
+
+
+
 def trip_detail_view(request, trip_id):
     if not request.user.is_authenticated:
         return redirect('register')
     
-    trip = get_object_or_404(Trip, id=trip_id, user=request.user)
+    trip = Trip.objects.filter(id=trip_id, user=request.user).first()
+    archived = trip is None
+    if archived:
+        # Past trips live in the archive; show them read-only.
+        archived_trip = get_object_or_404(ArchivedTrip, id=trip_id, user=request.user)
+        trip = archived_trip.to_trip()
+        shares = archived_trip.shares
+    else:
+        shares = trip.shares
+    shares = list(shares.filter(revoked_at__isnull=True).only('id', 'trip_id', 'archived_trip_id', 'created_at'))
+    for share in shares:
+        share.url = request.build_absolute_uri(reverse('shared_trip', args=[share.token]))
     
     itinerary = None
     if trip.itinerary:
@@ -512,12 +425,136 @@ def trip_detail_view(request, trip_id):
         except json.JSONDecodeError:
             itinerary = {"raw_itinerary": trip.itinerary}
     
+    forecasts = []
+    ai_pending = False
+    if not archived:
+        ai_pending = (trip.itinerary_source == Trip.ITINERARY_RULES and not trip.is_booked
+                      and refinement.pending(trip.id))
+        forecasts = WeatherForecast.objects.filter(
+            destination=providers.normalize_destination(trip.destination),
+            date__range=(trip.start_date, trip.end_date),
+        ).order_by('date')
+    
     return render(request, 'trip_detail.html', {
         'trip': trip,
-        'itinerary': itinerary
+        'itinerary': itinerary,
+        'forecasts': forecasts,
+        'shares': shares,
+        'ai_pending': ai_pending,
+        'archived': archived
     })
 
 
+def share_trip_view(request, trip_id):
+    """Create a public read-only link to the trip"""
+    if not request.user.is_authenticated:
+        return redirect('register')
+
+    trip = get_object_or_404(Trip, id=trip_id, user=request.user)
+    if request.method == "POST":
+        sharing.create_share(trip)
+        messages.success(request, "Share link created. Anyone with the link can view this itinerary.")
+    return redirect('trip_detail', trip_id=trip.id)
+
+
+def revoke_share_view(request, trip_id, share_id):
+    if not request.user.is_authenticated:
+        return redirect('register')
+
+    share = get_object_or_404(
+        TripShare.objects.filter(
+            Q(trip_id=trip_id, trip__user=request.user)
+            | Q(archived_trip_id=trip_id, archived_trip__user=request.user)
+        ),
+        id=share_id,
+    )
+    if request.method == "POST" and share.revoked_at is None:
+        share.revoked_at = timezone.now()
+        share.save(update_fields=['revoked_at'])
+        messages.success(request, "Share link revoked.")
+    return redirect('trip_detail', trip_id=trip_id)
+
+
+def shared_trip_view(request, token):
+    """
+    Public page behind a share link: the stored snapshot, with an ETag and a
+    public Cache-Control so browsers and CDNs can reuse it. Nothing here
+    reads the session or user, so responses don't vary by cookie.
+    """
+    share_id = TripShare.id_from_token(token)
+    row = None
+    if share_id is not None:
+        row = TripShare.objects.filter(id=share_id, revoked_at__isnull=True).values_list('etag', 'html').first()
+    if row is None:
+        raise Http404("Share link not found")
+
+    etag, html = row
+    etag = f'"{etag}"'
+    cache_control = f"public, max-age={settings.SHARE_CACHE_SECONDS}"
+    # Weak comparison, as for GET: W/"x" matches "x".
+    wanted = parse_etags(request.headers.get('If-None-Match', ''))
+    if '*' in wanted or etag in (tag.removeprefix('W/') for tag in wanted):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(html)
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    response['X-Robots-Tag'] = 'noindex'
+    return response
+
+
+
+def edit_trip_view(request, trip_id):
+    """Edit trip details, regenerating only the parts of the plan that changed"""
+    if not request.user.is_authenticated:
+        return redirect('register')
+
+    trip = get_object_or_404(Trip, id=trip_id, user=request.user)
+    if trip.is_booked:
+        messages.error(request, "Booked trips can't be edited.")
+        return redirect('trip_detail', trip_id=trip.id)
+
+    old = replan.snapshot(trip)
+    if request.method == "POST":
+        form = TripForm(request.POST, instance=trip)
+        if form.is_valid():
+            if not form.has_changed():
+                return redirect('trip_detail', trip_id=trip.id)
+
+            try:
+                if trip.duration_days <= 0:
+                    raise ValueError("End date must be after start date.")
+                # Moving the dates only re-labels days; anything else may call the AI.
+                if (set(form.changed_data) & {'destination', 'budget', 'travelers', 'interests'}
+                        or trip.duration_days != (old['end_date'] - old['start_date']).days):
+                    ratelimit.limit('plan', f"user:{request.user.pk}")
+                actions = replan.replan_trip(trip, old, generate_itinerary_days)
+                trip.save()
+                if trip.itinerary_source == Trip.ITINERARY_RULES:
+                    refinement.submit(trip, generate_itinerary_with_ai)
+                if actions:
+                    messages.success(request, f"Trip updated: {', '.join(actions)}.")
+                else:
+                    messages.success(request, "Trip updated.")
+                return redirect('trip_detail', trip_id=trip.id)
+
+            except ratelimit.RateLimited as e:
+                messages.warning(request, f"Trip planning is busy right now. Please try again in {e.retry_after} seconds.")
+            except providers.ProviderError as e:
+                messages.error(request, f"API error: {e}")
+            except ValueError as e:
+                messages.error(request, str(e))
+            except Exception as e:
+                messages.error(request, f"Something went wrong: {e}")
+        # The rejected edit must not leak into the page through the instance.
+        for field, value in old.items():
+            setattr(trip, field, value)
+    else:
+        form = TripForm(instance=trip)
+
+    return render(request, 'edit_trip.html', {'form': form, 'trip': trip})
+
+
 
 def delete_trip_view(request, trip_id):
     if not request.user.is_authenticated:
@@ -549,11 +586,11 @@ def send_whatsapp_reminder_view(request, trip_id):
         except json.JSONDecodeError:
             itinerary = {"raw_itinerary": trip.itinerary}
     
-    whatsapp_url = send_whatsapp_notification(trip, itinerary)
+    whatsapp = notifications.dispatch(trip, itinerary, channels=['whatsapp'])['whatsapp']
     
-    if whatsapp_url:
+    if whatsapp.ok:
         messages.success(request, "WhatsApp message ready! Click the button below to send.")
-        request.session['whatsapp_url'] = whatsapp_url
+        request.session['whatsapp_url'] = whatsapp.detail
     else:
         messages.error(request, "Failed to generate WhatsApp message. Please check your phone number.")
     
@@ -566,6 +603,11 @@ def resend_ticket_email_view(request, trip_id):
     
     trip = get_object_or_404(Trip, id=trip_id, user=request.user)
     
+    retry_after = ratelimit.take('resend_ticket', f"user:{request.user.pk}")
+    if retry_after:
+        messages.warning(request, f"Tickets were resent recently. Please try again in {retry_after} seconds.")
+        return redirect('trip_detail', trip_id=trip.id)
+    
     itinerary = None
     if trip.itinerary:
         try:
@@ -573,9 +615,12 @@ def resend_ticket_email_view(request, trip_id):
         except json.JSONDecodeError:
             itinerary = {"raw_itinerary": trip.itinerary}
     
-    email_sent = send_ticket_email(trip, itinerary)
+    email = notifications.dispatch(trip, itinerary, channels=['email'])['email']
     
-    if email_sent:
+    if email.ok:
+        trip.is_booked = True
+        trip.tickets_sent = True
+        trip.save()
         messages.success(request, "Ticket email resent successfully!")
     else:
         messages.error(request, "Failed to resend email. Please try again.")
@@ -584,6 +629,55 @@ def resend_ticket_email_view(request, trip_id):
 
 
 
+@staff_member_required
+def metrics_view(request):
+    """Rate limiter decisions, LLM latency and AI queue state for this worker, as JSON"""
+    return JsonResponse({
+        'rate_limits': ratelimit.counters(),
+        'llm_models': llm.model_latency_stats(),
+        'itinerary_queue': refinement.stats(),
+    })
+
+
+
+@staff_member_required
+def booking_lookup_view(request):
+    """Find a trip by booking reference or ticket ID, for support staff, as JSON"""
+    code = request.GET.get('ref', '').strip().upper()
+    field = references.lookup_field(code)
+    if field is None:
+        return JsonResponse({'error': "Pass ?ref= with a booking reference (TRP…) or ticket ID (TKT…)."}, status=400)
+
+    trip = Trip.objects.select_related('user').filter(**{field: code}).first()
+    archived = trip is None
+    if archived:
+        row = ArchivedTrip.objects.select_related('user').filter(**{field: code}).first()
+        if row is None:
+            return JsonResponse({'error': "No booking found.", 'ref': code}, status=404)
+        trip = row.to_trip()
+        trip.user = row.user
+
+    return JsonResponse({
+        'id': trip.id,
+        'booking_reference': trip.booking_reference,
+        'ticket_id': trip.ticket_id,
+        'destination': trip.destination,
+        'start_date': trip.start_date,
+        'end_date': trip.end_date,
+        'travelers': trip.travelers,
+        'budget': trip.formatted_budget,
+        'is_booked': trip.is_booked,
+        'tickets_sent': trip.tickets_sent,
+        'archived': archived,
+        'user': {'username': trip.user.username, 'email': trip.user.email},
+        'admin_url': reverse(
+            'admin:itinerary_archivedtrip_change' if archived else 'admin:itinerary_trip_change',
+            args=[trip.id],
+        ),
+    })
+
+
+
 def logout_view(request):
     logout(request)
     messages.success(request, "You have been logged out successfully.")
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'travelplanner.settings')
 
 application = get_asgi_application()
+
+# Load views and compile templates before the first request arrives.
+from itinerary.startup import warm  # noqa: E402
+
+warm()
@@ -52,6 +52,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'itinerary.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -87,6 +88,17 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv("CACHE_BACKEND", 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv("CACHE_LOCATION", 'travelplanner'),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -133,15 +145,128 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # ---------------------- FREE API KEYS CONFIGURATION ----------------------
 
+# .env is loaded once, at the top of this file; the app reads keys from here
+# only. The older OPENWEATHER_API / GEOAPIFY_API variable names still work.
+
 # OpenWeatherMap API (Free tier: 1000 calls/day)
 # Get from: https://home.openweathermap.org/api_keys
-OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")  # Replace with your free key
+OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY") or os.getenv("OPENWEATHER_API")
 
 # Geoapify API (Free tier: 3000 calls/day)  
 # Get from: https://www.geoapify.com/get-started-with-maps-api
-GEOAPIFY_API_KEY = os.getenv("GEOAPIFY_API_KEY")  # Replace with your free key
+GEOAPIFY_API_KEY = os.getenv("GEOAPIFY_API_KEY") or os.getenv("GEOAPIFY_API")
+
+# OpenRouter API
+# Get from: https://openrouter.ai/keys
+OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+
+# Provider lookups (weather, places, routes) are single-flighted: concurrent
+# identical calls share one upstream request and its result is kept in the
+# cache for the timeouts below. Sharing across worker processes needs a shared
+# cache backend, e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+PROVIDER_TIMEOUT = float(os.getenv("PROVIDER_TIMEOUT", "10"))
+PROVIDER_CACHE_TIMEOUTS = {
+    'weather': 6 * 60 * 60,
+    'places': 24 * 60 * 60,
+    'route': 7 * 24 * 60 * 60,
+}
+
+# Local POI index built with `manage.py build_poi_index`. Attraction and hotel
+# lookups use it first and fall back to Geoapify when it has fewer than
+# POI_MIN_RESULTS matches (or when the file does not exist).
+POI_INDEX_PATH = os.getenv("POI_INDEX_PATH", BASE_DIR / 'data' / 'poi.idx')
+POI_MIN_RESULTS = int(os.getenv("POI_MIN_RESULTS", "3"))
+
+# Destination autocomplete: curated places (one per line, optionally followed
+# by a tab and a popularity count) merged with trip destinations that at least
+# AUTOCOMPLETE_MIN_TRIPS trips from AUTOCOMPLETE_MIN_USERS users went to. Each
+# worker builds the index on first use and rebuilds it after AUTOCOMPLETE_REFRESH.
+KNOWN_PLACES_PATH = os.getenv("KNOWN_PLACES_PATH", BASE_DIR / 'data' / 'places.tsv')
+AUTOCOMPLETE_LIMIT = 8
+AUTOCOMPLETE_REFRESH = 15 * 60
+AUTOCOMPLETE_MIN_TRIPS = int(os.getenv("AUTOCOMPLETE_MIN_TRIPS", "5"))
+AUTOCOMPLETE_MIN_USERS = int(os.getenv("AUTOCOMPLETE_MIN_USERS", "3"))
+
+# Median worker boot time (import + setup + warm-up) enforced by
+# `manage.py bench_startup`.
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "1500"))
+
+# Token buckets (see itinerary/ratelimit.py): `capacity` requests, refilled
+# evenly over `per_seconds`. plan / resend_* are per user or session; the
+# provider buckets are global and guard the shared API quotas.
+RATE_LIMITS = {
+    'plan': {'capacity': 5, 'per_seconds': 10 * 60},
+    'resend_otp': {'capacity': 3, 'per_seconds': 10 * 60},
+    'resend_ticket': {'capacity': 3, 'per_seconds': 10 * 60},
+    'openrouter': {'capacity': 60, 'per_seconds': 60},
+    # Background AI itineraries (imports, `manage.py refine_trips`); kept
+    # well under 'openrouter' so interactive planning always has headroom.
+    'openrouter_background': {'capacity': 20, 'per_seconds': 60},
+    'openweather': {'capacity': 60, 'per_seconds': 60},
+    'geoapify': {'capacity': 100, 'per_seconds': 60},
+    'osrm': {'capacity': 60, 'per_seconds': 60},
+}
+
+# Bulk CSV trip import: each distinct destination is enriched once, with at
+# most TRIP_IMPORT_CONCURRENCY lookups in flight, and trips are saved with a
+# rule-based plan TRIP_IMPORT_BATCH_SIZE at a time. A rate-limited lookup
+# waits up to TRIP_IMPORT_RETRY_WAIT seconds in all for its bucket. AI
+# itineraries are queued while the 'openrouter_background' bucket allows;
+# `manage.py refine_trips` (run it from cron every few minutes) queues the
+# rest and re-runs lookups that still failed.
+TRIP_IMPORT_MAX_ROWS = 500
+TRIP_IMPORT_BATCH_SIZE = 20
+TRIP_IMPORT_CONCURRENCY = 4
+TRIP_IMPORT_RETRY_WAIT = 5
+
+# Trip-date forecasts are refreshed by `manage.py refresh_forecasts` (run it
+# from cron every few hours) for trips overlapping the next FORECAST_DAYS.
+FORECAST_DAYS = 5
+
+# OpenRouter models, tried in order. When the current model has not started
+# responding within OPENROUTER_HEDGE_AFTER seconds a backup request is sent to
+# the next one; the first valid completion wins and the others are cancelled.
+OPENROUTER_MODELS = [
+    model.strip()
+    for model in os.getenv("OPENROUTER_MODELS", "openai/gpt-3.5-turbo,openai/gpt-4o-mini").split(",")
+    if model.strip()
+]
+OPENROUTER_HEDGE_AFTER = float(os.getenv("OPENROUTER_HEDGE_AFTER", "8"))
+OPENROUTER_TIMEOUT = float(os.getenv("OPENROUTER_TIMEOUT", "30"))
+OPENROUTER_MAX_WORKERS = int(os.getenv("OPENROUTER_MAX_WORKERS", "16"))
+
+# New trips are saved straight away with a rule-based itinerary and the AI
+# one is generated in the background (see itinerary/refinement.py). Beyond
+# OPENROUTER_QUEUE_MAX_DEPTH queued jobs per worker process new trips keep the
+# rule-based plan. 0 workers generates inline during the request.
+OPENROUTER_QUEUE_WORKERS = int(os.getenv("OPENROUTER_QUEUE_WORKERS", "2"))
+OPENROUTER_QUEUE_MAX_DEPTH = int(os.getenv("OPENROUTER_QUEUE_MAX_DEPTH", "20"))
+
+# Trips that ended more than this many days ago are moved to the compressed
+# ArchivedTrip table by `manage.py archive_trips` (run it daily from cron).
+TRIP_ARCHIVE_AFTER_DAYS = int(os.getenv("TRIP_ARCHIVE_AFTER_DAYS", "180"))
+
+# Key for deriving booking references and ticket IDs from trip ids
+# (itinerary/references.py). Keep it fixed once trips are booked: codes made
+# with another key can collide with stored ones.
+BOOKING_REFERENCE_KEY = os.getenv("BOOKING_REFERENCE_KEY") or SECRET_KEY
+
+# Sampling profiler (itinerary/profiling.py). Staff profile a request by
+# sending the X-Profile header or adding ?profile; PROFILE_SAMPLE_RATE
+# profiles that fraction of all requests. Folded stacks are written to
+# PROFILE_DIR, keeping the newest PROFILE_KEEP files.
+PROFILE_HEADER = "X-Profile"
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", BASE_DIR / 'profiles')
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "200"))
+
+# Public share links (trip/<id>/share/) serve a stored snapshot of the trip
+# page with an ETag, cacheable by browsers and CDNs for this many seconds, so
+# revoking a link or editing the trip can take this long to reach copies
+# that are already cached.
+SHARE_CACHE_SECONDS = int(os.getenv("SHARE_CACHE_SECONDS", "3600"))
 
-# No AI API - Using local itinerary generation
 # Email Configuration (Use Gmail SMTP - Free)
 EMAIL_BACKEND = os.getenv("EMAIL_BACKEND")
 EMAIL_HOST = os.getenv("EMAIL_HOST")
@@ -151,7 +276,18 @@ EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL")
 
-# No SMS API - Using WhatsApp only (free)
+# Booking notification channels, sent concurrently by itinerary/notifications.py.
+# BACKEND is a NotificationChannel subclass; WORKERS sizes the channel's thread
+# pool and RETRIES is how often a failed send is retried (with exponential
+# backoff from NOTIFICATION_RETRY_DELAY seconds). Use
+# itinerary.notifications.LocmemChannel to stub any channel out locally.
+NOTIFICATION_CHANNELS = {
+    'email': {'BACKEND': 'itinerary.notifications.EmailChannel', 'WORKERS': 4, 'RETRIES': 2},
+    'whatsapp': {'BACKEND': 'itinerary.notifications.WhatsAppLinkChannel', 'WORKERS': 2, 'RETRIES': 0},
+    # No SMS API - the console backend only logs the message
+    'sms': {'BACKEND': 'itinerary.notifications.ConsoleSMSChannel', 'WORKERS': 2, 'RETRIES': 1},
+}
+NOTIFICATION_RETRY_DELAY = 0.5
 
 MESSAGE_TAGS = {
     messages.DEBUG: 'secondary',
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'travelplanner.settings')
 
 application = get_wsgi_application()
+
+# Load views and compile templates before the first request arrives.
+from itinerary.startup import warm  # noqa: E402
+
+warm()